@@ -1,21 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlmodel import Session
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
+import json
 from ..core.database import get_session
 from ..core.schemas import (
     TempleCreate, TempleOut,
     WeaponCreate, WeaponOut,
     FossilCreate, FossilOut,
-    FeedbackOut
+    FeedbackOut,
+    CatalogCollection
 )
 from ..db.crud import (
     create_temple, update_temple, delete_temple,
     create_weapon, update_weapon, delete_weapon,
     create_fossil, update_fossil, delete_fossil,
+    bulk_create_catalog_items, finish_catalog_import, stream_catalog_items,
     get_visit_stats,
+    get_visit_timeseries,
     get_leaderboard,
     get_all_feedback,
 )
 from ..api.user import get_current_user
+from ..core.security import get_password_pool_stats
 from ..db.models import User
 
 router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
@@ -187,6 +197,111 @@ def remove_fossil(
         )
     return {"message": "Fossil deleted successfully"}
 
+# ===============================================
+# Bulk Import & Export
+# ===============================================
+
+# The schema each imported line must match, per collection.
+IMPORT_SCHEMAS = {
+    "temples": TempleCreate,
+    "weapons": WeaponCreate,
+    "fossils": FossilCreate,
+}
+
+IMPORT_BATCH_SIZE = 500
+# We report at most this many bad lines, so a completely wrong file doesn't produce a huge response.
+MAX_REPORTED_IMPORT_ERRORS = 100
+
+@router.post("/{collection}/import")
+async def import_collection(
+    collection: CatalogCollection,
+    request: Request,
+    session: Session = Depends(get_session),
+    admin: User = Depends(get_current_admin),
+):
+    """
+    Admins can add many items at once by uploading NDJSON: one JSON object per line,
+    in the same shape as the single-item endpoints. The upload is read as it arrives,
+    each line is validated, and valid items are saved in batches of 500.
+    A line with an `id` (like every line of an export) replaces the item with that id,
+    or creates it, so loading an export back in doesn't duplicate anything.
+    Lines that fail validation are skipped and reported back with their line number.
+    """
+    schema = IMPORT_SCHEMAS[collection]
+    batch, errors = [], []
+    imported = failed = line_number = 0
+    
+    async def save_batch():
+        nonlocal imported, batch
+        if batch:
+            imported += await run_in_threadpool(bulk_create_catalog_items, session, collection, batch, admin.id)
+            batch = []
+    
+    def parse_line(raw: bytes):
+        nonlocal failed, line_number
+        line_number += 1
+        if not raw.strip():
+            return
+        try:
+            data = json.loads(raw)
+            item = schema.model_validate(data).model_dump()
+            item_id = data.get("id") if isinstance(data, dict) else None
+            if item_id is not None:
+                if isinstance(item_id, bool) or not isinstance(item_id, int) or item_id < 1:
+                    raise ValueError("id must be a positive whole number")
+                item["id"] = item_id
+            batch.append(item)
+        except (ValueError, ValidationError) as e:
+            failed += 1
+            if len(errors) < MAX_REPORTED_IMPORT_ERRORS:
+                errors.append({"line": line_number, "error": str(e)})
+    
+    leftover = b""
+    try:
+        async for chunk in request.stream():
+            lines = (leftover + chunk).split(b"\n")
+            leftover = lines.pop()
+            for raw in lines:
+                parse_line(raw)
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    await save_batch()
+        parse_line(leftover)
+        await save_batch()
+    finally:
+        # Whatever made it in should show up in the catalog and the JSON file, even if the upload broke off.
+        if imported:
+            finish_catalog_import(collection)
+    
+    return {
+        "message": f"Imported {imported} {collection}",
+        "imported": imported,
+        "failed": failed,
+        "errors": errors,
+    }
+
+@router.get("/{collection}/export")
+def export_collection(
+    collection: CatalogCollection,
+    admin: User = Depends(get_current_admin),
+):
+    """
+    Admins can download a whole collection as NDJSON (one item per line).
+    Items are streamed straight from the database, so even large collections
+    start downloading right away. The file can be loaded back in with the import endpoint;
+    each item keeps its id, so that updates the existing items rather than adding copies.
+    """
+    fields = ["id", *IMPORT_SCHEMAS[collection].model_fields]
+    
+    def lines():
+        for item in stream_catalog_items(collection, fields):
+            yield json.dumps(item, ensure_ascii=False, default=str) + "\n"
+    
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{collection}.ndjson"'}
+    )
+
 # ===============================================
 # Analytics & Dashboard
 # ===============================================
@@ -203,6 +318,37 @@ def get_visit_statistics(
     stats = get_visit_stats(session)
     return stats
 
+def _naive_utc(moment: Optional[datetime]) -> Optional[datetime]:
+    """Our visit times are stored as naive UTC, so times with a zone (`...Z`, `+05:30`) are converted to that."""
+    if moment is None or moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+@router.get("/visits/timeseries")
+def get_visit_time_series(
+    start: Optional[datetime] = Query(None, description="Start of the range (UTC). Defaults to 7 days before `end`."),
+    end: Optional[datetime] = Query(None, description="End of the range (UTC). Defaults to now."),
+    bucket: Literal["hour", "day"] = "day",
+    room: Optional[str] = None,
+    session: Session = Depends(get_session),
+    admin: User = Depends(get_current_admin),
+):
+    """
+    Admins can see how many visits each room got per hour or per day over a date range.
+    This helps spot busy times, e.g. school trips on weekday mornings.
+    """
+    end = _naive_utc(end) or datetime.utcnow()
+    start = _naive_utc(start) or end - timedelta(days=7)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The start of the range must be before the end."
+        )
+    try:
+        return get_visit_timeseries(session, start, end, bucket, room)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 @router.get("/leaderboard")
 def get_top_scores(
     game_mode: str = None,
@@ -229,3 +375,13 @@ def get_user_feedback(
     """
     feedback = get_all_feedback(session, limit)
     return {"feedback": feedback}
+
+@router.get("/password-pool")
+def get_password_pool_statistics(
+    admin: User = Depends(get_current_admin),
+):
+    """
+    Admins can check how busy the password pool is: jobs waiting, jobs turned away,
+    and how long logins spend queueing before bcrypt gets to them.
+    """
+    return get_password_pool_stats()
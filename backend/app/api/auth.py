@@ -1,19 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlmodel import Session
 from ..core.schemas import UserCreate, UserLogin, Token, UserOut
 from ..db.crud import create_user, get_user_by_email
-from ..core.security import verify_password
+from ..core.security import PasswordPoolBusy, hash_password_async, verify_password_async
 from ..core.jwt import create_access_token
 from ..core.database import get_session
 
 router = APIRouter(prefix="/api/v1/auth", tags=["auth"])
 
+async def _password_job(job):
+    """
+    Waits for a password job from the password pool.
+    If the pool is already full, we'd rather ask the user to retry than make everyone wait.
+    """
+    try:
+        return await job
+    except PasswordPoolBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Lots of visitors are signing in right now. Please try again in a moment.",
+            headers={"Retry-After": "1"}
+        )
+
 @router.post("/register", response_model=dict)
-def register(user: UserCreate, session: Session = Depends(get_session)):
+async def register(user: UserCreate, session: Session = Depends(get_session)):
     """
     Handles new user registration.
     It's case-insensitive, so 'user@example.com' and 'USER@example.com' are treated as the same.
+    Database calls run in the threadpool, and the bcrypt hashing runs in the password pool.
     """
     # We'll convert the email to lowercase to ensure we don't have duplicate accounts with different casing.
     normalized_email = user.email.lower().strip()
@@ -21,7 +37,7 @@ def register(user: UserCreate, session: Session = Depends(get_session)):
     print(f"📝 Registration attempt for: {normalized_email}")
     
     # Let's check if someone has already registered with this email.
-    existing = get_user_by_email(session, normalized_email)
+    existing = await run_in_threadpool(get_user_by_email, session, normalized_email)
     if existing:
         print(f"⚠️  User already exists: {normalized_email}")
         raise HTTPException(
@@ -31,12 +47,13 @@ def register(user: UserCreate, session: Session = Depends(get_session)):
     
     # All good? Let's create the new user account.
     print(f"✅ Creating new user: {normalized_email}")
-    new_user = create_user(session, normalized_email, user.password)
+    hashed = await _password_job(hash_password_async(user.password))
+    new_user = await run_in_threadpool(create_user, session, normalized_email, hashed)
     print(f"✓ User created with ID: {new_user.id}")
     return {"message": "Welcome! Your account has been created successfully."}
 
 @router.post("/login", response_model=Token)
-def login(form_data: UserLogin, session: Session = Depends(get_session)):
+async def login(form_data: UserLogin, session: Session = Depends(get_session)):
     """
     Handles user login.
     Just like registration, email matching is case-insensitive.
@@ -44,7 +61,7 @@ def login(form_data: UserLogin, session: Session = Depends(get_session)):
     # Normalize the email to make sure we can find the user, regardless of how they typed it.
     normalized_email = form_data.email.lower().strip()
     
-    user = get_user_by_email(session, normalized_email)
+    user = await run_in_threadpool(get_user_by_email, session, normalized_email)
     
     # Debug logging
     print(f"🔍 Login attempt for: {normalized_email}")
@@ -58,7 +75,7 @@ def login(form_data: UserLogin, session: Session = Depends(get_session)):
         )
     
     print(f"🔐 Verifying password...")
-    password_valid = verify_password(form_data.password, user.hashed_password)
+    password_valid = await _password_job(verify_password_async(form_data.password, user.hashed_password))
     print(f"✓ Password valid: {password_valid}")
     
     if not password_valid:
@@ -1,23 +1,59 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import Response
 from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import Session
 from ..core.jwt import decode_access_token
-from ..db.crud import get_all_temples, get_all_weapons, get_all_fossils
-from ..core.schemas import TempleOut, WeaponOut, FossilOut
+from ..db.crud import get_all_temples, get_all_weapons, get_all_fossils, get_fossil_by_id, get_catalog_page, count_catalog_rows_before, CATALOG_SORT_COLUMNS
+from ..db.models import Temple, Weapon, Fossil
+from ..core.schemas import TempleOut, WeaponOut, FossilOut, CatalogPage, CatalogBundleOut, CatalogCollection, SearchHit, SearchResults, Suggestion, SuggestResults, RelatedItem, RelatedItems, TimelineCollection, TimelineItem, TimelineResults
 from ..core.database import get_session
+from ..core.catalog_cache import CATALOG_COLLECTIONS, CatalogEntry, bump_catalog_version, get_catalog_entry
+from ..core.http_cache import accepts_gzip, etag_matches, make_etag, not_modified, unmodified_since
+from ..core.media_index import media_cache, media_index
+from ..core.image_variants import VARIANT_FORMATS, image_variants
+from ..core.image_placeholders import image_placeholders
+from ..core.catalog_bundle import get_catalog_bundle
+from ..core.catalog_search import search_index
+from ..core.catalog_suggest import suggest_index
+from ..core.catalog_related import RELATED_TOP_K, related_index
+from ..core.catalog_timeline import timeline_index
+from ..core.chronology import GEOLOGIC_TIME, geologic_years
+from ..core.catalog_facets import facet_index
+from ..core.media_response import MediaFileResponse
 from ..api.user import get_current_user
-from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+import base64
+import json
 
-STATIC_PATH = Path(__file__).parent.parent / "static"
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 router = APIRouter(prefix="/api/v1/content", tags=["content"])
 
-@router.get("/temples", response_model=list[TempleOut])
-def get_temples(current_user=Depends(get_current_user), session: Session = Depends(get_session)):
-    """Fetches all temple records, adding the correct paths for media files."""
-    temples = get_all_temples(session)
-    return [TempleOut(
+def _media_url(category: str, media_type: str, filename: str) -> str:
+    """
+    The path the frontend uses for a media file: the category folder, plus the filename
+    with a fingerprint of its content (`temples/brihadeeswara.3f2a9c1b0d.jpg`), so the
+    browser can cache it for good.
+    """
+    return f"{category}/{media_index.versioned_name(f'{media_type}/{category}', filename)}"
+
+def _image_details(category: str, filename: str) -> dict:
+    """
+    The image's pixel size and blurred placeholder, if they're ready. They're made in
+    the background; the catalog is rebuilt once they are.
+    """
+    relative_path = f"images/{category}/{filename}"
+    media = media_index.get(relative_path)
+    placeholder = image_placeholders.get(relative_path, media) if media is not None else None
+    if placeholder is None:
+        return {}
+    return {
+        "image_width": placeholder.width,
+        "image_height": placeholder.height,
+        "image_placeholder": placeholder.data_uri,
+    }
+
+def _temple_out(t) -> TempleOut:
+    return TempleOut(
         id=t.id,
         name=t.name,
         dynasty=t.dynasty,
@@ -25,31 +61,29 @@ def get_temples(current_user=Depends(get_current_user), session: Session = Depen
         time_period=t.time_period,
         historical_significance=t.historical_significance,
         weapon_used=t.weapon_used,
-        static_image_url=f"temples/{t.static_image_url}",  # We add the 'temples/' prefix here
+        static_image_url=_media_url("temples", "images", t.static_image_url),  # We add the 'temples/' prefix here
         model_3d_embed=t.model_3d_embed,
-        audio_story_url=f"temples/{t.audio_story_url}"      # And here too
-    ) for t in temples]
-
-@router.get("/weapons", response_model=list[WeaponOut])
-def get_weapons(current_user=Depends(get_current_user), session: Session = Depends(get_session)):
-    """Fetches all weapon records, adding the correct paths for media files."""
-    weapons = get_all_weapons(session)
-    return [WeaponOut(
+        audio_story_url=_media_url("temples", "audio", t.audio_story_url),      # And here too
+        start_year=t.start_year,
+        end_year=t.end_year,
+        **_image_details("temples", t.static_image_url),
+    )
+
+def _weapon_out(w) -> WeaponOut:
+    return WeaponOut(
         id=w.id,
         name=w.name,
         dynasty_context=w.dynasty_context,
         type=w.type,
         description=w.description,
-        image_url=f"weapons/{w.image_url}",        # Adding the 'weapons/' prefix
+        image_url=_media_url("weapons", "images", w.image_url),        # Adding the 'weapons/' prefix
         model_3d_embed=w.model_3d_embed,
-        audio_story_url=f"weapons/{w.audio_story_url}"  # And for the audio
-    ) for w in weapons]
-
-@router.get("/fossils", response_model=list[FossilOut])
-def get_fossils(current_user=Depends(get_current_user), session: Session = Depends(get_session)):
-    """Fetches all fossil records from the paleontology collection."""
-    fossils = get_all_fossils(session)
-    return [FossilOut(
+        audio_story_url=_media_url("weapons", "audio", w.audio_story_url),  # And for the audio
+        **_image_details("weapons", w.image_url),
+    )
+
+def _fossil_out(f) -> FossilOut:
+    return FossilOut(
         id=f.id,
         name=f.name,
         fossil_type=f.fossil_type,
@@ -57,13 +91,514 @@ def get_fossils(current_user=Depends(get_current_user), session: Session = Depen
         age_in_years=f.age_in_years,
         description=f.description,
         origin_location=f.origin_location,
-        image_url=f"fossils/{f.image_url}",
+        image_url=_media_url("fossils", "images", f.image_url),
         model_3d_embed=f.model_3d_embed,
-        audio_story_url=f"fossils/{f.audio_story_url}"
-    ) for f in fossils]
+        audio_story_url=_media_url("fossils", "audio", f.audio_story_url),
+        start_year=f.start_year,
+        end_year=f.end_year,
+        **_image_details("fossils", f.image_url),
+    )
+
+# The catalog needs a login, so shared caches shouldn't keep it, but the browser
+# may hold on to it as long as it checks back with us (via the ETag) before reuse.
+CATALOG_CACHE_CONTROL = "private, no-cache"
+
+def _refresh_catalog_media(changed_paths: set):
+    """The catalog carries media fingerprints, so a collection is rebuilt when one of its files changes."""
+    for path in changed_paths:
+        parts = path.split("/")
+        if len(parts) == 3 and parts[1] in CATALOG_COLLECTIONS:
+            bump_catalog_version(parts[1])
+
+media_index.add_listener(_refresh_catalog_media)
+image_placeholders.add_listener(_refresh_catalog_media)
+
+def temples_entry(session: Session) -> CatalogEntry:
+    """The cached temples collection, loaded from the database on a miss."""
+    return get_catalog_entry("temples", lambda: [_temple_out(t) for t in get_all_temples(session)])
+
+def weapons_entry(session: Session) -> CatalogEntry:
+    """The cached weapons collection, loaded from the database on a miss."""
+    return get_catalog_entry("weapons", lambda: [_weapon_out(w) for w in get_all_weapons(session)])
+
+def fossils_entry(session: Session) -> CatalogEntry:
+    """The cached fossils collection, loaded from the database on a miss."""
+    return get_catalog_entry("fossils", lambda: [_fossil_out(f) for f in get_all_fossils(session)])
+
+def fossil_detail(session: Session, fossil_id: int) -> Tuple[Optional[FossilOut], Optional[str]]:
+    """
+    One fossil as the catalog serves it, with the ETag of exactly that body. A fossil
+    added through another worker since our catalog was cached is read directly, and has
+    no ETag yet. (None, None) if there's no such fossil.
+    """
+    entry = fossils_entry(session)
+    etag = entry.item_etags.get(fossil_id)
+    if etag:
+        return next(item for item in entry.items if item.id == fossil_id), etag
+    fossil = get_fossil_by_id(session, fossil_id)
+    return (_fossil_out(fossil) if fossil else None), None
+
+def _catalog_response(entry: CatalogEntry, if_none_match: Optional[str]) -> Response:
+    """
+    Sends the cached JSON bytes as they are, without going through Pydantic again.
+    If the browser already has this exact version, a bodyless 304 is all it needs.
+    """
+    headers = {"ETag": entry.etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+    if etag_matches(if_none_match, entry.etag):
+        return not_modified(entry.etag, headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+# ===============================================
+# Paginated catalog reads
+# ===============================================
+
+CATALOG_PAGE_DEFAULT_LIMIT = 50
+CATALOG_PAGE_MAX_LIMIT = 500
+
+# The database stores bare filenames. The API adds the collection folder in front
+# (and a fingerprint), so we need to know which folder under app/static each one lives in.
+MEDIA_FIELDS = {"static_image_url": "images", "image_url": "images", "audio_story_url": "audio"}
+
+# Fields that don't come from a column but from the item's image (see `_image_details`).
+IMAGE_DETAIL_FIELDS = {"image_width", "image_height", "image_placeholder"}
+IMAGE_COLUMNS = {Temple: "static_image_url", Weapon: "image_url", Fossil: "image_url"}
+
+def _encode_cursor(sort_value, item_id: int) -> str:
+    """Packs the position of the last row on a page into an opaque, URL-safe string."""
+    raw = json.dumps([sort_value, item_id], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _decode_cursor(cursor: str, model) -> tuple:
+    """
+    Unpacks a cursor from `_encode_cursor`, or raises a 400 if it was tampered with.
+    The sort value has to be of the same type as the column the collection is listed by,
+    or it couldn't be compared with it.
+    """
+    sort_type = model.model_fields[CATALOG_SORT_COLUMNS[model]].annotation
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        if isinstance(sort_value, bool) or not isinstance(sort_value, sort_type):
+            raise ValueError("unexpected sort value")
+        return sort_value, int(item_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="That page cursor isn't valid. Start again from the first page.")
+
+def _parse_fields(fields: Optional[str], out_schema) -> list[str]:
+    """Turns `fields=name,dynasty` into a list of column names, checking each one exists."""
+    allowed = list(out_schema.model_fields)
+    if not fields:
+        return allowed
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s): {', '.join(unknown)}. Valid fields are: {', '.join(allowed)}"
+        )
+    # The id always comes along, so the frontend can tell the items apart.
+    return list(dict.fromkeys(["id", *requested]))
+
+def _catalog_page(
+    session: Session,
+    collection: str,
+    model,
+    out_schema,
+    fields: Optional[str],
+    cursor: Optional[str],
+    limit: Optional[int],
+    if_none_match: Optional[str],
+) -> Response:
+    """
+    Serves one page of a collection as a `CatalogPage`.
+    Only the requested columns are read from the database, and pages are found with
+    a keyset cursor, so the cost of a page doesn't grow with the size of the collection.
+    """
+    columns = _parse_fields(fields, out_schema)
+    page_size = min(max(limit or CATALOG_PAGE_DEFAULT_LIMIT, 1), CATALOG_PAGE_MAX_LIMIT)
+    after = _decode_cursor(cursor, model) if cursor else None
+    
+    # The image details are worked out from the image filename, so that's the column we read for them.
+    db_columns = [name for name in columns if name not in IMAGE_DETAIL_FIELDS]
+    wants_image_details = len(db_columns) < len(columns)
+    if wants_image_details:
+        db_columns.append(IMAGE_COLUMNS[model])
+    
+    # We ask for one extra row so we know whether there's another page after this one.
+    rows = get_catalog_page(session, model, db_columns, after, page_size + 1)
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    
+    items = []
+    for row in rows:
+        details = _image_details(collection, row[IMAGE_COLUMNS[model]]) if wants_image_details else {}
+        item = {name: row[name] if name in row else details.get(name) for name in columns}
+        for name in MEDIA_FIELDS.keys() & item.keys():
+            item[name] = _media_url(collection, MEDIA_FIELDS[name], item[name])
+        items.append(item)
+    
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = _encode_cursor(last[CATALOG_SORT_COLUMNS[model]], last["id"])
+    
+    body = CatalogPage(items=items, next_cursor=next_cursor).model_dump_json().encode("utf-8")
+    etag = make_etag(f"{collection}-page", body)
+    headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _facet_filters(**filters: Optional[List[str]]) -> Dict[str, List[str]]:
+    """The facet filters that were actually given, e.g. {"dynasty": ["Chola Dynasty"]}."""
+    return {facet: values for facet, values in filters.items() if values}
+
+def _faceted_page(
+    session: Session,
+    collection: str,
+    model,
+    out_schema,
+    entry: CatalogEntry,
+    filters: Dict[str, List[str]],
+    fields: Optional[str],
+    cursor: Optional[str],
+    limit: Optional[int],
+    if_none_match: Optional[str],
+) -> Response:
+    """
+    Serves one page of the items that match the facet filters, with the facet counts.
+    The matching is done on the in-memory facet bitsets, and the items come from the
+    catalog cache, so this doesn't query the database at all.
+    """
+    columns = _parse_fields(fields, out_schema)
+    page_size = min(max(limit or CATALOG_PAGE_DEFAULT_LIMIT, 1), CATALOG_PAGE_MAX_LIMIT)
+    facet_index.ensure_fresh(session, [collection])
+    matching_ids, facets = facet_index.query(collection, filters)
+    
+    # The cached items are already in catalog order. The cursor says which item the last page ended on.
+    matches = [item for item in entry.items if item.id in matching_ids]
+    start = 0
+    if cursor:
+        after = _decode_cursor(cursor, model)
+        positions = [index for index, item in enumerate(matches) if item.id == after[1]]
+        if positions:
+            start = positions[0] + 1
+        else:
+            # That item has since been deleted or edited, so we pick up after where it would have been.
+            # The database tells us where that is, so it's ordered by the same collation as the cache.
+            before = count_catalog_rows_before(session, model, after)
+            catalog_order = {item.id: index for index, item in enumerate(entry.items)}
+            start = sum(1 for item in matches if catalog_order[item.id] < before)
+    page = matches[start:start + page_size]
+    
+    next_cursor = None
+    if start + page_size < len(matches) and page:
+        last = page[-1]
+        next_cursor = _encode_cursor(getattr(last, CATALOG_SORT_COLUMNS[model]), last.id)
+    
+    items = [item.model_dump(include=set(columns)) for item in page]
+    body = CatalogPage(items=items, next_cursor=next_cursor, total=len(matches), facets=facets).model_dump_json().encode("utf-8")
+    etag = make_etag(f"{collection}-facets", body)
+    headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _is_page_request(fields: Optional[str], cursor: Optional[str], limit: Optional[int]) -> bool:
+    """Without any paging parameters, we serve the whole collection from the cache like before."""
+    return fields is not None or cursor is not None or limit is not None
+
+# ===============================================
+# Catalog endpoints
+# ===============================================
+
+PAGE_QUERY_DOCS = {
+    "fields": "Comma-separated list of fields to include, e.g. `name,dynasty`.",
+    "cursor": "The `next_cursor` from the previous page.",
+    "limit": f"Items per page (default {CATALOG_PAGE_DEFAULT_LIMIT}, at most {CATALOG_PAGE_MAX_LIMIT}).",
+    "facets": "Include the facet counts (they're always included when filtering).",
+    "filter": "Only items with this {}. Repeat it to allow several values.",
+}
+
+@router.get("/temples", response_model=Union[list[TempleOut], CatalogPage])
+def get_temples(
+    current_user=Depends(get_current_user),
+    session: Session = Depends(get_session),
+    fields: Optional[str] = Query(None, description=PAGE_QUERY_DOCS["fields"]),
+    cursor: Optional[str] = Query(None, description=PAGE_QUERY_DOCS["cursor"]),
+    limit: Optional[int] = Query(None, description=PAGE_QUERY_DOCS["limit"]),
+    facets: bool = Query(False, description=PAGE_QUERY_DOCS["facets"]),
+    dynasty: Optional[List[str]] = Query(None, description=PAGE_QUERY_DOCS["filter"].format("dynasty")),
+    builder: Optional[List[str]] = Query(None, description=PAGE_QUERY_DOCS["filter"].format("builder")),
+    century: Optional[List[str]] = Query(None, description=PAGE_QUERY_DOCS["filter"].format("century, e.g. `11th Century AD`")),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Fetches all temple records, adding the correct paths for media files.
+    Pass `limit`, `cursor` or `fields` to get a `CatalogPage` instead of the full list,
+    and facet filters (or `facets=true`) to get matching items with facet counts.
+    """
+    filters = _facet_filters(dynasty=dynasty, builder=builder, century=century)
+    if filters or facets:
+        return _faceted_page(session, "temples", Temple, TempleOut, temples_entry(session), filters, fields, cursor, limit, if_none_match)
+    if _is_page_request(fields, cursor, limit):
+        return _catalog_page(session, "temples", Temple, TempleOut, fields, cursor, limit, if_none_match)
+    return _catalog_response(temples_entry(session), if_none_match)
+
+@router.get("/weapons", response_model=Union[list[WeaponOut], CatalogPage])
+def get_weapons(
+    current_user=Depends(get_current_user),
+    session: Session = Depends(get_session),
+    fields: Optional[str] = Query(None, description=PAGE_QUERY_DOCS["fields"]),
+    cursor: Optional[str] = Query(None, description=PAGE_QUERY_DOCS["cursor"]),
+    limit: Optional[int] = Query(None, description=PAGE_QUERY_DOCS["limit"]),
+    facets: bool = Query(False, description=PAGE_QUERY_DOCS["facets"]),
+    weapon_type: Optional[List[str]] = Query(None, alias="type", description=PAGE_QUERY_DOCS["filter"].format("type")),
+    dynasty: Optional[List[str]] = Query(None, description=PAGE_QUERY_DOCS["filter"].format("dynasty (any of its `dynasty_context`)")),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Fetches all weapon records, adding the correct paths for media files.
+    Pass `limit`, `cursor` or `fields` to get a `CatalogPage` instead of the full list,
+    and facet filters (or `facets=true`) to get matching items with facet counts.
+    """
+    filters = _facet_filters(type=weapon_type, dynasty=dynasty)
+    if filters or facets:
+        return _faceted_page(session, "weapons", Weapon, WeaponOut, weapons_entry(session), filters, fields, cursor, limit, if_none_match)
+    if _is_page_request(fields, cursor, limit):
+        return _catalog_page(session, "weapons", Weapon, WeaponOut, fields, cursor, limit, if_none_match)
+    return _catalog_response(weapons_entry(session), if_none_match)
+
+@router.get("/fossils", response_model=Union[list[FossilOut], CatalogPage])
+def get_fossils(
+    current_user=Depends(get_current_user),
+    session: Session = Depends(get_session),
+    fields: Optional[str] = Query(None, description=PAGE_QUERY_DOCS["fields"]),
+    cursor: Optional[str] = Query(None, description=PAGE_QUERY_DOCS["cursor"]),
+    limit: Optional[int] = Query(None, description=PAGE_QUERY_DOCS["limit"]),
+    facets: bool = Query(False, description=PAGE_QUERY_DOCS["facets"]),
+    era: Optional[List[str]] = Query(None, description=PAGE_QUERY_DOCS["filter"].format("era")),
+    fossil_type: Optional[List[str]] = Query(None, description=PAGE_QUERY_DOCS["filter"].format("fossil type")),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Fetches all fossil records from the paleontology collection.
+    Pass `limit`, `cursor` or `fields` to get a `CatalogPage` instead of the full list,
+    and facet filters (or `facets=true`) to get matching items with facet counts.
+    """
+    filters = _facet_filters(era=era, fossil_type=fossil_type)
+    if filters or facets:
+        return _faceted_page(session, "fossils", Fossil, FossilOut, fossils_entry(session), filters, fields, cursor, limit, if_none_match)
+    if _is_page_request(fields, cursor, limit):
+        return _catalog_page(session, "fossils", Fossil, FossilOut, fields, cursor, limit, if_none_match)
+    return _catalog_response(fossils_entry(session), if_none_match)
+
+# How to get each collection's cached response models, by collection name.
+CATALOG_ENTRIES = {
+    "temples": temples_entry,
+    "weapons": weapons_entry,
+    "fossils": fossils_entry,
+}
+
+# ===============================================
+# Catalog Bundle
+# ===============================================
+
+def _media_manifest(entries: dict) -> dict:
+    """
+    The images and audio the catalog refers to, by the URL the items use, with their
+    size and type, so the frontend can preload them (or decide not to).
+    """
+    manifest = {"images": {}, "audio": {}}
+    for entry in entries.values():
+        for item in entry.items:
+            for field, media_type in MEDIA_FIELDS.items():
+                url = getattr(item, field, None)
+                if not url:
+                    continue
+                category, _, filename = url.partition("/")
+                media, _ = media_index.lookup(f"{media_type}/{category}", filename)
+                if media is not None:
+                    manifest[media_type][url] = {"size": media.stat.st_size, "type": media.media_type}
+    return manifest
+
+@router.get("/bundle", response_model=CatalogBundleOut)
+def catalog_bundle(
+    current_user=Depends(get_current_user),
+    session: Session = Depends(get_session),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+):
+    """
+    The whole catalog in one go: temples, weapons, fossils and a manifest of their media.
+    It's made ahead of time and sent gzipped to browsers that accept it, and like the
+    collections it carries an ETag, so a repeat visit usually gets an empty 304.
+    """
+    entries = {name: entry(session) for name, entry in CATALOG_ENTRIES.items()}
+    bundle = get_catalog_bundle(entries, lambda: _media_manifest(entries))
+    
+    gzipped = accepts_gzip(accept_encoding)
+    etag = bundle.gzip_etag if gzipped else bundle.etag
+    headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    # Either ETag means the browser already has this version of the bundle.
+    if etag_matches(if_none_match, bundle.etag) or etag_matches(if_none_match, bundle.gzip_etag):
+        return not_modified(etag, headers)
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=bundle.gzipped, media_type="application/json", headers=headers)
+    return Response(content=bundle.body, media_type="application/json", headers=headers)
+
+# ===============================================
+# Search
+# ===============================================
+
+def _cached_items(session: Session, collections) -> dict:
+    """
+    The items of the given collections by id, as collection -> id -> item. They come from
+    the catalog cache, so they look just like the list endpoints' items.
+    """
+    return {name: {item.id: item for item in CATALOG_ENTRIES[name](session).items} for name in collections}
+
+@router.get("/search", response_model=SearchResults)
+def search_catalog(
+    q: str = Query(..., min_length=1, max_length=200, description="What to search for, e.g. `chola granite`."),
+    collection: Optional[CatalogCollection] = Query(None, description="Only search this collection."),
+    limit: int = Query(20, ge=1, le=100, description="How many results to return."),
+    current_user=Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """
+    Searches temples, weapons and fossils, best matches first.
+    Results are ranked with BM25 over names, dynasties, builders and descriptions.
+    """
+    search_index.ensure_fresh(session)
+    total, hits = search_index.search(q, collection, limit)
+    
+    items = _cached_items(session, {hit_collection for hit_collection, _, _ in hits})
+    results = [
+        SearchHit(collection=name, id=item_id, score=round(score, 4), item=items[name][item_id].model_dump())
+        for name, item_id, score in hits
+        if item_id in items[name]
+    ]
+    return SearchResults(query=q, total=total, results=results)
+
+@router.get("/suggest", response_model=SuggestResults)
+def suggest_catalog(
+    q: str = Query(..., min_length=1, max_length=100, description="What's been typed so far, e.g. `brihadis`."),
+    collection: Optional[CatalogCollection] = Query(None, description="Only suggest from this collection."),
+    limit: int = Query(10, ge=1, le=50, description="How many suggestions to return."),
+    current_user=Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """
+    Typeahead for the search box: names, dynasties, builders and eras that start with
+    what's been typed. Different spellings of the same name match each other, so
+    "Brihadisvara" finds "Brihadeeswara Temple".
+    """
+    suggest_index.ensure_fresh(session)
+    suggestions = [
+        Suggestion(text=text, kind=kind, collection=name, id=item_id)
+        for kind, text, name, item_id in suggest_index.suggest(q, collection, limit)
+    ]
+    return SuggestResults(query=q, suggestions=suggestions)
+
+# ===============================================
+# Related Items
+# ===============================================
+
+def _related_items(matches, items: dict) -> list:
+    return [
+        RelatedItem(collection=name, id=item_id, score=round(score, 4), item=items[name][item_id].model_dump())
+        for name, item_id, score in matches
+        if item_id in items[name]
+    ]
+
+@router.get("/{collection}/{item_id}/related", response_model=RelatedItems)
+def related_items(
+    collection: CatalogCollection,
+    item_id: int,
+    response: Response,
+    limit: int = Query(6, ge=1, le=RELATED_TOP_K, description="How many items of each kind to return."),
+    current_user=Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """
+    What to show alongside an item's detail view: the most similar items in its collection
+    (by description), and the temples or weapons of the same dynasty. These are worked out
+    ahead of time in the background, so this is just a lookup. For an item that's only
+    just been added, they may not be ready yet: then you get a 202 with empty lists.
+    """
+    related_index.ensure_fresh(session)
+    related = related_index.related(collection, item_id, limit)
+    if related is None:
+        raise HTTPException(status_code=404, detail=f"We couldn't find that item in {collection}.")
+    similar, linked, ready = related
+    if not ready:
+        response.status_code = status.HTTP_202_ACCEPTED
+    items = _cached_items(session, {name for name, _, _ in similar + linked})
+    return RelatedItems(
+        collection=collection,
+        id=item_id,
+        similar=_related_items(similar, items),
+        linked=_related_items(linked, items),
+        ready=ready,
+    )
+
+# ===============================================
+# Timeline
+# ===============================================
+
+@router.get("/timeline", response_model=TimelineResults)
+def timeline(
+    collection: TimelineCollection = Query(..., description="Which collection to put on the timeline."),
+    start: Optional[int] = Query(None, description="The first year of the range. BC years are negative, e.g. `-300`."),
+    end: Optional[int] = Query(None, description="The last year of the range."),
+    era: Optional[str] = Query(None, max_length=50, description="A geological era or period instead of years, e.g. `Jurassic`."),
+    limit: int = Query(100, ge=1, le=1000, description="How many items to return."),
+    current_user=Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """
+    The temples or fossils that fall (at least partly) within a range of years, in order
+    of when they start. For example `?collection=temples&start=900&end=1200` for the
+    temples built from 900 to 1200 AD, or `?collection=fossils&era=Jurassic`.
+    Items whose dates we can't read aren't on the timeline.
+    """
+    if era is not None:
+        if start is not None or end is not None:
+            raise HTTPException(status_code=400, detail="Please give either an era or start and end years, not both.")
+        start, end = geologic_years(era)
+        if start is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Sorry, '{era}' isn't an era we know. Try one of: {', '.join(name.capitalize() for name in GEOLOGIC_TIME)}",
+            )
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="The start year must come before the end year.")
+    
+    timeline_index.ensure_fresh(session, [collection])
+    spans = timeline_index.query(collection, start, end)
+    items = _cached_items(session, [collection])[collection]
+    results = [
+        TimelineItem(id=item_id, start_year=span_start, end_year=span_end, item=items[item_id].model_dump())
+        for span_start, span_end, item_id in spans[:limit]
+        if item_id in items
+    ]
+    return TimelineResults(collection=collection, start=start, end=end, total=len(spans), items=results)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
 @router.get("/media/{category}/{media_type}/{filename}")
-def get_media(category: str, media_type: str, filename: str, token: str = None):
+def get_media(
+    category: str,
+    media_type: str,
+    filename: str,
+    token: str = None,
+    w: Optional[int] = Query(None, ge=1, le=4096, description="Resize an image to (about) this width in pixels."),
+    fmt: Optional[str] = Query(None, description="Re-encode an image as `webp`, `jpeg` or `png`."),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+):
     """
     This endpoint serves up our static files like images and audio.
     It's like a bouncer for our media, making sure everything is requested correctly.
@@ -85,32 +620,59 @@ def get_media(category: str, media_type: str, filename: str, token: str = None):
     if media_type not in valid_media_types:
         raise HTTPException(status_code=400, detail=f"Sorry, '{media_type}' is not a valid media type.")
     
-    # Now, let's build the full path to the file.
-    file_path = STATIC_PATH / media_type / category / filename
-    
-    if not file_path.exists():
+    # The media index already knows every file's size, type and content hash, so we don't need to check the disk.
+    media, fingerprint = media_index.lookup(f"{media_type}/{category}", filename)
+    if media is None:
         raise HTTPException(status_code=404, detail=f"We couldn't find the file '{filename}'.")
     
-    # We need to tell the browser what kind of file we're sending (e.g., an image or an audio file).
-    media_types_map = {
-        'jpg': 'image/jpeg',
-        'jpeg': 'image/jpeg',
-        'png': 'image/png',
-        'gif': 'image/gif',
-        'mp3': 'audio/mpeg',
-        'wav': 'audio/wav',
+    if fingerprint is None:
+        cache_control = "public, max-age=3600" # Let's cache this for an hour to speed things up.
+    elif fingerprint == media.fingerprint:
+        # This URL will only ever mean these exact bytes, so the browser can keep it for a year.
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        # An old fingerprint: we send the current file, but it mustn't be cached under the old URL.
+        cache_control = "public, no-cache"
+    
+    headers = {
+        "Cache-Control": cache_control,
+        "ETag": media.etag,
+        "Last-Modified": media.last_modified,
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "*"
     }
     
-    file_extension = filename.split('.')[-1].lower()
-    content_type = media_types_map.get(file_extension, 'application/octet-stream')
-    
-    return FileResponse(
-        str(file_path),
-        media_type=content_type,
-        headers={
-            "Cache-Control": "public, max-age=3600", # Let's cache this for an hour to speed things up.
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET, OPTIONS",
-            "Access-Control-Allow-Headers": "*"
-        }
-    )
\ No newline at end of file
+    # A resized or re-encoded copy was asked for. It has its own ETag, since its bytes differ from the original.
+    wants_variant = w is not None or fmt is not None
+    if wants_variant:
+        if not media.media_type.startswith("image/"):
+            raise HTTPException(status_code=400, detail="Only images can be resized or converted.")
+        if fmt is not None and fmt not in VARIANT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Sorry, '{fmt}' is not a supported format. Try one of: {', '.join(VARIANT_FORMATS)}")
+        variant_path, _ = image_variants.variant_path(media, w, fmt)
+        headers["ETag"] = f'"{variant_path.name}"'
+    
+    # If the browser already has this exact file, there's nothing to send.
+    if etag_matches(if_none_match, headers["ETag"]) or (not if_none_match and unmodified_since(if_modified_since, media.stat.st_mtime)):
+        return Response(status_code=304, headers=headers)
+    
+    if wants_variant:
+        # Made once in the variant pool, then served from the disk cache. If it can't be made
+        # right now (the pool is busy, say), the original will do.
+        variant = image_variants.get(media, w, fmt)
+        if variant is not None:
+            return MediaFileResponse(str(variant[0]), media_type=variant[1], headers=headers)
+        headers["ETag"] = media.etag
+        # This URL should mean the resized copy, so nobody may keep the original under it.
+        headers["Cache-Control"] = "no-cache"
+    
+    # MediaFileResponse answers Range requests, so seeking in the audio player only fetches what it needs.
+    # Popular small images come straight from memory, and still get the same Range handling.
+    return MediaFileResponse(
+        str(media.path),
+        media_type=media.media_type,
+        headers=headers,
+        stat_result=media.stat,
+        content=media_cache.get(media),
+    )
@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel import Session
 from ..core.database import get_session
 from ..core.schemas import FeedbackCreate, FeedbackOut
-from ..db.crud import create_feedback, create_visit
+from ..db.crud import create_feedback
+from ..core.visit_buffer import VisitBufferFull, visit_buffer
 from ..api.user import get_current_user
 from ..db.models import User
 
@@ -29,13 +30,13 @@ def submit_feedback(
 @router.post("/track-visit")
 def track_room_visit(
     visit_data: dict,
-    session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
     """
     Tracks when a user visits a specific room.
     This data helps admins understand which areas are most visited.
     Valid rooms: "temples", "weapons", "fossils", "game"
+    Visits are queued and saved in batches, so this returns without waiting for the database.
     """
     room_name = visit_data.get('room')
     if not room_name:
@@ -51,5 +52,12 @@ def track_room_visit(
             detail=f"Invalid room. Valid rooms are: {valid_rooms}"
         )
     
-    visit = create_visit(session, current_user.id, room_name)
+    try:
+        visit_buffer.record(current_user.id, room_name)
+    except VisitBufferFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="We're a little busy recording visits right now. Please try again shortly.",
+            headers={"Retry-After": "5"}
+        )
     return {"message": f"Visit to {room_name} recorded"}
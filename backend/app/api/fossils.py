@@ -1,19 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from sqlmodel import Session
+from typing import Optional
 from ..core.database import get_session
 from ..core.schemas import FossilOut, FossilCreate
 from ..db.crud import (
     get_all_fossils,
-    get_fossil_by_id,
     create_fossil,
     update_fossil,
     delete_fossil,
 )
 from ..api.user import get_current_user
+from ..api.content import fossil_detail
+from ..core.http_cache import etag_matches, not_modified
 from ..db.models import User
 
 router = APIRouter(prefix="/api/v1/content/fossils", tags=["fossils"])
 
+# This endpoint is public, but browsers should still check back before reusing a copy.
+FOSSIL_CACHE_CONTROL = "public, no-cache"
+
 @router.get("", response_model=list[FossilOut])
 def get_fossils(session: Session = Depends(get_session)):
     """
@@ -24,14 +29,26 @@ def get_fossils(session: Session = Depends(get_session)):
     return fossils
 
 @router.get("/{fossil_id}", response_model=FossilOut)
-def get_fossil(fossil_id: int, session: Session = Depends(get_session)):
+def get_fossil(
+    fossil_id: int,
+    response: Response,
+    session: Session = Depends(get_session),
+    if_none_match: Optional[str] = Header(None),
+):
     """
     Gets detailed information about a specific fossil.
+    The fossil and its ETag both come from the cached catalog, so the ETag always
+    matches the body we send.
     """
-    fossil = get_fossil_by_id(session, fossil_id)
+    fossil, etag = fossil_detail(session, fossil_id)
     if not fossil:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Fossil not found"
         )
+    if etag:
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, {"Cache-Control": FOSSIL_CACHE_CONTROL})
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = FOSSIL_CACHE_CONTROL
     return fossil
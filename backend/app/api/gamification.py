@@ -1,13 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlmodel import Session
+from typing import Optional
 from ..core.database import get_session
-from ..core.schemas import HighScoreCreate, HighScoreOut
-from ..db.crud import create_high_score, get_leaderboard, get_user_high_scores
+from ..core.schemas import HighScoreCreate, HighScoreOut, LeaderboardEntryOut, LeaderboardRankOut
+from ..db.crud import (
+    create_high_score,
+    get_leaderboard,
+    get_leaderboard_around,
+    get_user_high_scores,
+    get_user_rank,
+)
 from ..api.user import get_current_user
 from ..db.models import User
 
 router = APIRouter(prefix="/api/v1/gamification", tags=["gamification"])
 
+def _entry_out(rank: int, score) -> LeaderboardEntryOut:
+    return LeaderboardEntryOut(
+        rank=rank,
+        id=score.id,
+        user_id=score.user_id,
+        score=score.score,
+        game_mode=score.game_mode,
+        achieved_at=score.achieved_at
+    )
+
 @router.post("/score", response_model=HighScoreOut)
 def submit_game_score(
     score_data: HighScoreCreate,
@@ -40,6 +57,39 @@ def get_game_leaderboard(
     scores = get_leaderboard(session, game_mode, limit)
     return scores
 
+@router.get("/leaderboard/rank", response_model=LeaderboardRankOut)
+def get_my_rank(
+    game_mode: Optional[str] = None,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Tells the current user where their best score sits on the leaderboard.
+    Leave out the game mode to see their place across all games.
+    """
+    result = get_user_rank(session, current_user.id, game_mode)
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="You don't have a score on this leaderboard yet. Play a round first!"
+        )
+    rank, score, total = result
+    return LeaderboardRankOut(game_mode=game_mode, total_entries=total, entry=_entry_out(rank, score))
+
+@router.get("/leaderboard/around", response_model=list[LeaderboardEntryOut])
+def get_leaderboard_neighbours(
+    rank: int = Query(..., ge=1, description="The place on the leaderboard to look around (1 is the top)."),
+    radius: int = Query(5, ge=0, le=50, description="How many places above and below to include."),
+    game_mode: Optional[str] = None,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Gets the scores just above and below a given place, e.g. to show a player's neighbours.
+    """
+    entries = get_leaderboard_around(session, game_mode, rank, radius)
+    return [_entry_out(place, score) for place, score in entries]
+
 @router.get("/my-scores", response_model=list[HighScoreOut])
 def get_my_high_scores(
     session: Session = Depends(get_session),
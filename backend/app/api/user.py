@@ -5,6 +5,7 @@ from ..core.jwt import decode_access_token
 from ..db.crud import get_user_by_email
 from ..core.schemas import UserOut
 from ..core.database import get_session
+from ..core.user_cache import cache_user, get_cached_user
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 router = APIRouter(prefix="/api/v1/user", tags=["user"])
@@ -17,10 +18,19 @@ def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Dep
     if not payload:
         raise HTTPException(status_code=401, detail="Your session is invalid. Please log in again.")
     
-    user = get_user_by_email(session, payload.get("sub"))
+    # Most requests come from someone we've seen recently, so we check our cache before asking MySQL.
+    email = (payload.get("sub") or "").lower().strip()
+    user_id = payload.get("id")
+    if user_id is not None:
+        user = get_cached_user(user_id)
+        if user and user.email == email:
+            return user
+    
+    user = get_user_by_email(session, email)
     if not user:
         raise HTTPException(status_code=404, detail="We couldn't find a user with that token. Please log in again.")
     
+    cache_user(user)
     return user
 
 @router.get("/me", response_model=UserOut)
@@ -0,0 +1,147 @@
+"""
+Startup helpers that keep worker boot fast.
+
+Every uvicorn worker runs the startup hook, and most of the time the database is
+already set up. So instead of running CREATE TABLE for every table on each boot, we
+keep a fingerprint of our table definitions in the `schema_version` table. If it
+matches, the schema step is a single query. If it doesn't (a model gained a column
+or an index), we create what's missing and store the new fingerprint.
+
+While one worker sets things up, the others wait on a MySQL named lock, and then find
+there's nothing left to do. The time spent in each startup step is recorded in
+`startup_timings` and printed at the end.
+"""
+
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+from sqlmodel import Session, SQLModel
+
+from ..db.models import SchemaVersion
+
+# Set FAST_START=false to run the full table setup on every start, fingerprint or not.
+FAST_START = os.getenv("FAST_START", "true").lower() not in ("0", "false", "no")
+
+# How long a worker waits for another worker to finish setting up the database.
+BOOTSTRAP_LOCK_NAME = "temple_museum_bootstrap"
+BOOTSTRAP_LOCK_TIMEOUT_SECONDS = int(os.getenv("BOOTSTRAP_LOCK_TIMEOUT_SECONDS", "120"))
+
+# Step name -> seconds it took, for this worker's most recent startup.
+startup_timings: Dict[str, float] = {}
+
+
+@contextmanager
+def startup_phase(title: str):
+    """Prints a step heading, runs the step, and records how long it took."""
+    print(f"\n{title}")
+    print("-" * 80)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[title] = round(time.perf_counter() - started, 3)
+
+
+def print_startup_timings():
+    total = sum(startup_timings.values())
+    print("\n⏱  Startup timings:")
+    for title, seconds in startup_timings.items():
+        print(f"   {title:<55} {seconds * 1000:8.0f} ms")
+    print(f"   {'Total':<55} {total * 1000:8.0f} ms")
+
+
+@contextmanager
+def bootstrap_lock(engine: Engine):
+    """
+    Makes sure only one worker sets up the database at a time. On MySQL this is a
+    named lock (GET_LOCK), held on its own connection. Other databases (SQLite in
+    development) only ever have one process, so there's nothing to lock.
+    """
+    if engine.dialect.name != "mysql":
+        yield
+        return
+    with engine.connect() as connection:
+        acquired = connection.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"),
+            {"name": BOOTSTRAP_LOCK_NAME, "timeout": BOOTSTRAP_LOCK_TIMEOUT_SECONDS},
+        ).scalar()
+        if acquired != 1:
+            # Better to carry on than to never start. Every step below is safe to repeat.
+            print("⚠️  Timed out waiting for another worker to set up the database, continuing anyway")
+        try:
+            yield
+        finally:
+            if acquired == 1:
+                connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": BOOTSTRAP_LOCK_NAME})
+
+
+def schema_fingerprint(engine: Engine) -> str:
+    """A hash of the DDL for every table and index our models define, in this database's dialect."""
+    digest = hashlib.sha256()
+    for table in SQLModel.metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=engine.dialect)).encode("utf-8"))
+        for index in sorted(table.indexes, key=lambda index: index.name or ""):
+            digest.update(str(CreateIndex(index).compile(dialect=engine.dialect)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _stored_fingerprint(engine: Engine):
+    try:
+        with Session(engine) as session:
+            row = session.get(SchemaVersion, 1)
+            return row.fingerprint if row else None
+    except SQLAlchemyError:
+        # The schema_version table doesn't exist yet, so this is a brand-new database.
+        return None
+
+
+def _add_missing_columns_and_indexes(engine: Engine):
+    """
+    `create_all` only creates tables that don't exist, so columns and indexes added to
+    an existing model would never reach the database. This adds them.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}"))
+                print(f"  ✓ Added column {table.name}.{column.name}")
+
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                index.create(connection)
+                print(f"  ✓ Added index {index.name} on {table.name}")
+
+
+def ensure_schema(engine: Engine) -> bool:
+    """
+    Creates or updates the tables if our models changed since the last start.
+    Returns True if any DDL was run, False if the schema was already up to date.
+    """
+    fingerprint = schema_fingerprint(engine)
+    if FAST_START and _stored_fingerprint(engine) == fingerprint:
+        print("✓ Database schema is up to date (skipped table setup)")
+        return False
+
+    print("Creating database tables...")
+    SQLModel.metadata.create_all(engine)
+    _add_missing_columns_and_indexes(engine)
+    with Session(engine) as session:
+        session.merge(SchemaVersion(id=1, fingerprint=fingerprint, applied_at=datetime.utcnow()))
+        session.commit()
+    print("✓ All tables created successfully!")
+    return True
@@ -0,0 +1,77 @@
+"""
+The whole catalog in one response, for the museum entrance.
+
+Instead of asking for temples, weapons and fossils one by one, the frontend can fetch
+a single bundle: all three collections plus a manifest of their media files. It's put
+together from the catalog cache's ready-made JSON, so building it is mostly joining
+bytes, and it's gzipped once when it's built rather than for every visitor.
+
+The bundle is rebuilt when any collection changes. Its ETag comes from the three
+collections' ETags, which come from their content, so every worker hands out the same
+ETag for the same catalog.
+"""
+
+import gzip
+import json
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from .catalog_cache import CATALOG_COLLECTIONS, CatalogEntry
+from .http_cache import make_etag
+
+# Compressing happens once per catalog change, so we can afford the smallest output.
+BUNDLE_GZIP_LEVEL = 9
+
+
+@dataclass(frozen=True)
+class CatalogBundle:
+    """The bundle's JSON, as is and gzipped, with an ETag for each."""
+    key: Tuple[str, ...]  # The ETags of the collections it was built from
+    body: bytes
+    gzipped: bytes
+    etag: str
+    gzip_etag: str
+
+
+_bundle: Optional[CatalogBundle] = None
+_build_lock = threading.Lock()
+
+
+def _build_bundle(key: Tuple[str, ...], entries: Dict[str, CatalogEntry], manifest: dict) -> CatalogBundle:
+    manifest_json = json.dumps(manifest, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    etag = make_etag("bundle", "".join(key).encode("utf-8") + manifest_json)
+    # The version in the body is the ETag without its quotes, so the frontend can tell bundles apart too.
+    parts = [b'{"version":', json.dumps(etag.strip('"')).encode("utf-8")]
+    for collection in CATALOG_COLLECTIONS:
+        parts += [b',"', collection.encode("utf-8"), b'":', entries[collection].body]
+    parts += [b',"media":', manifest_json, b"}"]
+    body = b"".join(parts)
+    return CatalogBundle(
+        key=key,
+        body=body,
+        # mtime=0 keeps the gzipped bytes the same for the same catalog.
+        gzipped=gzip.compress(body, compresslevel=BUNDLE_GZIP_LEVEL, mtime=0),
+        etag=etag,
+        # The gzipped bytes are a different representation, so they get their own ETag.
+        gzip_etag=f'{etag[:-1]}-gzip"',
+    )
+
+
+def get_catalog_bundle(entries: Dict[str, CatalogEntry], build_manifest: Callable[[], dict]) -> CatalogBundle:
+    """
+    The bundle for these catalog entries (one per collection), rebuilt only if one of
+    them has changed since last time. `build_manifest` should return the media manifest.
+    """
+    global _bundle
+    key = tuple(entries[collection].etag for collection in CATALOG_COLLECTIONS)
+    bundle = _bundle
+    if bundle is not None and bundle.key == key:
+        return bundle
+    with _build_lock:
+        # Another request may have built it while we were waiting for the lock.
+        bundle = _bundle
+        if bundle is None or bundle.key != key:
+            bundle = _build_bundle(key, entries, build_manifest())
+            _bundle = bundle
+        return bundle
@@ -0,0 +1,128 @@
+"""
+A read-through cache for the museum catalog (temples, weapons and fossils).
+
+The catalog only changes when an admin edits it, so there's no reason to query MySQL
+and rebuild every response model for each visitor. Instead, we keep the finished JSON
+bytes for each collection in memory, tagged with a version number. The admin CRUD
+functions bump that version when they commit, and the next read rebuilds the entry.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+from pydantic import BaseModel
+
+from .http_cache import make_etag
+
+CATALOG_COLLECTIONS = ("temples", "weapons", "fossils")
+
+# Every worker process keeps its own cache, so an edit made through another worker
+# only shows up here once our entry is this old. Set it to 0 to never expire entries.
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "300"))
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """One cached collection: the response models, their serialized JSON and ETags."""
+    version: int
+    items: tuple
+    body: bytes
+    etag: str
+    item_etags: Dict[int, str]
+    built_at: float
+
+
+_versions: Dict[str, int] = {collection: 0 for collection in CATALOG_COLLECTIONS}
+_entries: Dict[str, CatalogEntry] = {}
+_lock = threading.Lock()
+# One build lock per collection, so a burst of visitors triggers a single rebuild.
+_build_locks = {collection: threading.Lock() for collection in CATALOG_COLLECTIONS}
+_item_listeners: List[Callable[[str, int, Optional[dict], int], None]] = []
+
+
+def get_catalog_version(collection: str) -> int:
+    """Returns the current version number of a catalog collection."""
+    return _versions[collection]
+
+
+def bump_catalog_version(collection: str) -> int:
+    """
+    Marks a collection as changed. Call this after an admin write has been committed,
+    so the next read rebuilds the cached response.
+    """
+    with _lock:
+        _versions[collection] += 1
+        _entries.pop(collection, None)
+        return _versions[collection]
+
+
+def add_item_listener(listener: Callable[[str, int, Optional[dict], int], None]):
+    """
+    Registers a function to call after one catalog item is saved or deleted, with
+    (collection, item id, the item as a dict or None if it was deleted, new version).
+    The in-memory indexes (search and so on) use this to update themselves in place.
+    """
+    _item_listeners.append(listener)
+
+
+def catalog_item_changed(collection: str, item_id: int, item: Optional[dict]) -> int:
+    """
+    Like `bump_catalog_version`, but for a single item, so listeners can update just
+    that item instead of reloading the collection. Pass `item=None` for a deletion.
+    """
+    version = bump_catalog_version(collection)
+    for listener in _item_listeners:
+        listener(collection, item_id, item, version)
+    return version
+
+
+def _is_fresh(entry: CatalogEntry, collection: str) -> bool:
+    if entry.version != _versions[collection]:
+        return False
+    if CATALOG_CACHE_TTL_SECONDS > 0 and time.monotonic() - entry.built_at > CATALOG_CACHE_TTL_SECONDS:
+        return False
+    return True
+
+
+def _build_entry(collection: str, version: int, items: tuple) -> CatalogEntry:
+    """Serializes the response models once and works out the ETags that go with them."""
+    chunks = [item.model_dump_json().encode("utf-8") for item in items]
+    body = b"[" + b",".join(chunks) + b"]"
+    # The ETags come from the content itself, so every worker that holds the same
+    # catalog hands out the same ETag, whatever its local version counter says.
+    return CatalogEntry(
+        version=version,
+        items=items,
+        body=body,
+        etag=make_etag(collection, body),
+        item_etags={item.id: make_etag(f"{collection}-{item.id}", chunk) for item, chunk in zip(items, chunks)},
+        built_at=time.monotonic(),
+    )
+
+
+def get_catalog_entry(collection: str, build: Callable[[], Sequence[BaseModel]]) -> CatalogEntry:
+    """
+    Returns the cached entry for a collection, calling `build` to load it if needed.
+    `build` should return the response models for the whole collection.
+    """
+    entry = _entries.get(collection)
+    if entry is not None and _is_fresh(entry, collection):
+        return entry
+
+    with _build_locks[collection]:
+        # Another request may have rebuilt the entry while we were waiting for the lock.
+        entry = _entries.get(collection)
+        if entry is not None and _is_fresh(entry, collection):
+            return entry
+
+        version = _versions[collection]
+        entry = _build_entry(collection, version, tuple(build()))
+        with _lock:
+            # If an admin edit landed while we were building, this entry is already
+            # out of date. We still serve it to this request, but we don't keep it.
+            if _versions[collection] == version:
+                _entries[collection] = entry
+        return entry
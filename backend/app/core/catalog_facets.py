@@ -0,0 +1,159 @@
+"""
+Faceted filtering for the catalog ("Chola temples from the 11th century").
+
+Every item in a collection gets a slot number, and every facet value (say, dynasty
+"Chola Dynasty") keeps a bitset, stored as a Python int, with the bits of the items
+that have it. Filtering is then a handful of ANDs and ORs on those ints, and counting
+how many items have each value is a popcount.
+
+The counts for the unfiltered collection are kept up to date as admins add, edit and
+delete items, so browsing without a filter needs no counting at all. Like the search
+index, it's kept in step through `catalog_index.py`.
+"""
+
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .catalog_index import CatalogIndex
+from .chronology import parse_centuries
+
+
+def _single(field: str) -> Callable[[dict], List[str]]:
+    return lambda item: [item.get(field)] if item.get(field) else []
+
+
+def _multiple(field: str) -> Callable[[dict], List[str]]:
+    return lambda item: [value for value in (item.get(field) or []) if value]
+
+
+# The facets of each collection, and how to read an item's values for each one.
+FACETS: Dict[str, Dict[str, Callable[[dict], List[str]]]] = {
+    "temples": {
+        "dynasty": _single("dynasty"),
+        "builder": _single("builder"),
+        "century": lambda item: parse_centuries(item.get("time_period")),
+    },
+    "weapons": {
+        "type": _single("type"),
+        "dynasty": _multiple("dynasty_context"),
+    },
+    "fossils": {
+        "era": _single("era"),
+        "fossil_type": _single("fossil_type"),
+    },
+}
+
+
+def _key(value: str) -> str:
+    # Filters match regardless of case and surrounding spaces.
+    return str(value).strip().casefold()
+
+
+class _CollectionFacets:
+    """The slots, bitsets and counts for one collection."""
+
+    def __init__(self, facets: Iterable[str]):
+        self.slots: Dict[int, int] = {}  # item id -> slot
+        self.ids: Dict[int, int] = {}  # slot -> item id
+        self.free: List[int] = []
+        self.all = 0
+        self.bits: Dict[str, Dict[str, int]] = {facet: defaultdict(int) for facet in facets}
+        self.counts: Dict[str, Dict[str, int]] = {facet: defaultdict(int) for facet in facets}
+        self.labels: Dict[str, Dict[str, str]] = {facet: {} for facet in facets}
+        self.values: Dict[int, Dict[str, Set[str]]] = {}  # item id -> facet -> its value keys
+
+
+class FacetIndex(CatalogIndex):
+    """Bitset posting lists for every facet value in every collection."""
+
+    def __init__(self):
+        super().__init__()
+        self._collections: Dict[str, _CollectionFacets] = {
+            collection: _CollectionFacets(facets) for collection, facets in FACETS.items()
+        }
+
+    def _add(self, collection: str, item: dict):
+        data = self._collections[collection]
+        slot = data.free.pop() if data.free else len(data.slots)
+        bit = 1 << slot
+        data.slots[item["id"]] = slot
+        data.ids[slot] = item["id"]
+        data.all |= bit
+        values: Dict[str, Set[str]] = {}
+        for facet, read in FACETS[collection].items():
+            keys = set()
+            for value in read(item):
+                key = _key(value)
+                if not key or key in keys:
+                    continue
+                keys.add(key)
+                data.labels[facet].setdefault(key, str(value).strip())
+                data.bits[facet][key] |= bit
+                data.counts[facet][key] += 1
+            values[facet] = keys
+        data.values[item["id"]] = values
+
+    def _remove(self, collection: str, item_id: int):
+        data = self._collections[collection]
+        slot = data.slots.pop(item_id, None)
+        if slot is None:
+            return
+        del data.ids[slot]
+        bit = 1 << slot
+        data.all &= ~bit
+        for facet, keys in data.values.pop(item_id).items():
+            for key in keys:
+                data.bits[facet][key] &= ~bit
+                data.counts[facet][key] -= 1
+                if not data.counts[facet][key]:
+                    del data.bits[facet][key], data.counts[facet][key], data.labels[facet][key]
+        data.free.append(slot)
+
+    def _reset(self, collection: str, items: List[dict]):
+        self._collections[collection] = _CollectionFacets(FACETS[collection])
+        for item in items:
+            self._add(collection, item)
+
+    def query(self, collection: str, filters: Dict[str, List[str]]) -> Tuple[Set[int], Dict[str, Dict[str, int]]]:
+        """
+        The ids of the items that match every filter (any of the listed values, for each
+        facet), and the facet counts for that filter. A facet's own counts ignore its own
+        filter, so the frontend can show how many items each other choice would give.
+        """
+        with self._lock:
+            data = self._collections[collection]
+            masks: Dict[str, int] = {}
+            for facet, wanted in filters.items():
+                mask = 0
+                for value in wanted:
+                    mask |= data.bits[facet].get(_key(value), 0)
+                masks[facet] = mask
+
+            matches = data.all
+            for mask in masks.values():
+                matches &= mask
+
+            facet_counts: Dict[str, Dict[str, int]] = {}
+            for facet in FACETS[collection]:
+                base = data.all
+                for other, mask in masks.items():
+                    if other != facet:
+                        base &= mask
+                if base == data.all:
+                    # No other facet narrows things down, so the running counts are the answer.
+                    counts = {key: count for key, count in data.counts[facet].items() if count}
+                else:
+                    counts = {key: (bits & base).bit_count() for key, bits in data.bits[facet].items()}
+                ranked = sorted(((count, key) for key, count in counts.items() if count), key=lambda pair: (-pair[0], pair[1]))
+                facet_counts[facet] = {data.labels[facet][key]: count for count, key in ranked}
+
+            ids = set()
+            while matches:
+                lowest = matches & -matches
+                ids.add(data.ids[lowest.bit_length() - 1])
+                matches ^= lowest
+        return ids, facet_counts
+
+
+# The facet index shared by every request in this worker.
+facet_index = FacetIndex()
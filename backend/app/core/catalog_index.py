@@ -0,0 +1,117 @@
+"""
+The groundwork shared by our in-memory catalog indexes (search, facets and so on).
+
+Each index is built from the database the first time it's needed, and then kept up to
+date item by item: the admin CRUD functions call `catalog_item_changed`, which passes
+the saved item to every index. If an index ever misses a change (a bulk import, an
+edit made through another worker, or two edits racing each other), the catalog version
+no longer lines up with the one it last saw, and it rebuilds that collection from the
+database on its next use. Like the catalog cache, it also rebuilds once it's
+CATALOG_CACHE_TTL_SECONDS old, to pick up edits made through other workers.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional
+
+from sqlmodel import Session, select
+
+from .catalog_cache import CATALOG_CACHE_TTL_SECONDS, CATALOG_COLLECTIONS, add_item_listener, get_catalog_version
+
+
+def item_text(value) -> str:
+    """Flattens a field (a string, or a list/dict from a JSON column) into plain text."""
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        return " ".join(item_text(part) for part in value.values())
+    if isinstance(value, (list, tuple)):
+        return " ".join(item_text(part) for part in value)
+    return str(value)
+
+
+def load_catalog_items(session: Session, collection: str) -> List[dict]:
+    """Every item in a collection, as plain dicts."""
+    # Imported here because crud.py imports the catalog cache, which this module builds on.
+    from ..db.crud import CATALOG_MODELS
+
+    return [row.model_dump() for row in session.exec(select(CATALOG_MODELS[collection])).all()]
+
+
+# Every index that's been created, so they can all be built at startup.
+_indexes: List["CatalogIndex"] = []
+
+
+class CatalogIndex(ABC):
+    """
+    Base class for an index over the catalog. Subclasses must fill in `_reset` (rebuild a
+    collection from a list of items), `_add` and `_remove`; all three are called with
+    `self._lock` held.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # The catalog version each collection was last brought up to date with, and when it was built.
+        self._versions: Dict[str, int] = {}
+        self._built_at: Dict[str, float] = {}
+        add_item_listener(self._item_changed)
+        _indexes.append(self)
+
+    @abstractmethod
+    def _reset(self, collection: str, items: List[dict]):
+        ...
+
+    @abstractmethod
+    def _add(self, collection: str, item: dict):
+        ...
+
+    @abstractmethod
+    def _remove(self, collection: str, item_id: int):
+        ...
+
+    def _item_changed(self, collection: str, item_id: int, item: Optional[dict], version: int):
+        with self._lock:
+            if self._versions.get(collection) != version - 1:
+                # We've missed a change in between, or haven't been built yet. We'll rebuild when needed.
+                self._versions.pop(collection, None)
+                return
+            self._remove(collection, item_id)
+            if item is not None:
+                self._add(collection, item)
+            self._versions[collection] = version
+
+    def _is_fresh(self, collection: str) -> bool:
+        if self._versions.get(collection) != get_catalog_version(collection):
+            return False
+        built_at = self._built_at.get(collection)
+        if CATALOG_CACHE_TTL_SECONDS > 0 and (built_at is None or time.monotonic() - built_at > CATALOG_CACHE_TTL_SECONDS):
+            return False
+        return True
+
+    def ensure_fresh(self, session: Session, collections: Optional[Iterable[str]] = None):
+        """Rebuilds any of the given collections (all of them by default) that are out of date."""
+        for collection in collections or CATALOG_COLLECTIONS:
+            if self._is_fresh(collection):
+                continue
+            # We note the version before reading, so an edit that lands while we read triggers another rebuild.
+            version = get_catalog_version(collection)
+            items = load_catalog_items(session, collection)
+            with self._lock:
+                self._reset(collection, items)
+                self._versions[collection] = version
+                self._built_at[collection] = time.monotonic()
+
+
+def build_catalog_indexes():
+    """Builds every catalog index up front, so the first searches don't have to. Runs once at startup."""
+    from .database import initialize_engine
+
+    try:
+        with Session(initialize_engine()) as session:
+            for index in _indexes:
+                index.ensure_fresh(session)
+        print(f"✓ Built {len(_indexes)} catalog index(es)")
+    except Exception as e:
+        # Each index builds itself on first use instead, so this isn't fatal.
+        print(f"❌ Failed to build the catalog indexes: {e}")
@@ -0,0 +1,279 @@
+"""
+"Related items" for the detail views: similar temples, and the weapons of a temple's dynasty.
+
+Similar items are found by comparing descriptions. Each item becomes a TF-IDF vector
+(its words, weighted up when they're rare in the collection), and two items are as
+similar as the cosine of the angle between their vectors. We keep the best
+RELATED_TOP_K matches for every item, so a request is just a lookup.
+
+Temples and weapons are also linked through their dynasties. The names don't always
+line up ("Maratha Dynasty" on a temple, "Maratha Empire" on a weapon), so we compare
+them without the words like "dynasty" and "empire".
+
+The work is done by a background thread, with NumPy. Admin edits reach the index
+through `catalog_index.py` as usual; they mark the collection as changed, and the
+thread recomputes that collection only. Until it has, requests get an empty answer
+rather than waiting.
+"""
+
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy
+
+from .catalog_index import CatalogIndex, item_text
+from .catalog_search import tokenize
+
+# How many similar items we keep for each item.
+RELATED_TOP_K = int(os.getenv("RELATED_TOP_K", "12"))
+
+# After an edit, we wait this long for more edits before recomputing, so a burst of them costs one run.
+RELATED_DEBOUNCE_SECONDS = 0.5
+
+# The text we compare in each collection, and how much each field counts.
+RELATED_FIELDS = {
+    "temples": {"name": 1.0, "dynasty": 1.0, "builder": 1.0, "historical_significance": 1.0, "weapon_used": 0.5},
+    "weapons": {"name": 1.0, "dynasty_context": 1.0, "type": 1.0, "description": 1.0},
+    "fossils": {"name": 1.0, "era": 1.0, "fossil_type": 1.0, "description": 1.0},
+}
+
+# The collections linked by dynasty, and the field each one keeps its dynasties in.
+DYNASTY_FIELDS = {"temples": "dynasty", "weapons": "dynasty_context"}
+
+# Words that say what kind of realm it was, rather than which one.
+_REALM_WORDS = {"dynasty", "dynasties", "empire", "kingdom", "kingdoms", "period", "the", "of", "rulers", "kings"}
+_PARENTHESES = re.compile(r"\([^)]*\)")
+
+# (collection, id, score)
+Related = Tuple[str, int, float]
+
+
+def dynasty_key(name: str) -> str:
+    """The part of a dynasty's name that says which one it is: "Maratha Empire" gives "maratha"."""
+    words = tokenize(_PARENTHESES.sub(" ", name or ""))
+    return " ".join(word for word in words if word not in _REALM_WORDS)
+
+
+def _dynasties(collection: str, item: dict) -> Set[str]:
+    value = item.get(DYNASTY_FIELDS[collection]) if collection in DYNASTY_FIELDS else None
+    names = value if isinstance(value, list) else [value]
+    return {key for key in (dynasty_key(name) for name in names if name) if key}
+
+
+def _term_counts(collection: str, item: dict) -> Dict[str, float]:
+    counts: Counter = Counter()
+    for field, weight in RELATED_FIELDS[collection].items():
+        for word in tokenize(item_text(item.get(field))):
+            counts[word] += weight
+    return dict(counts)
+
+
+def _tfidf_vectors(documents: Dict[int, Dict[str, float]]) -> Dict[int, Dict[str, float]]:
+    """Unit-length TF-IDF vectors, as {word: weight}."""
+    document_frequency: Counter = Counter()
+    for counts in documents.values():
+        document_frequency.update(counts.keys())
+    total = len(documents)
+    vectors = {}
+    for item_id, counts in documents.items():
+        vector = {
+            word: (1 + math.log(count)) * (math.log((1 + total) / (1 + document_frequency[word])) + 1)
+            for word, count in counts.items()
+            if count > 0
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        vectors[item_id] = {word: weight / norm for word, weight in vector.items()}
+    return vectors
+
+
+def top_k_similar(documents: Dict[int, Dict[str, float]], k: int) -> Dict[int, List[Tuple[int, float]]]:
+    """
+    The `k` most similar documents to each one, by cosine similarity of their TF-IDF
+    vectors. The vectors are kept sparse (only the words each item actually has), and
+    we score one item at a time through the postings of its words, so memory grows
+    with the number of words in the catalog, not with items times vocabulary.
+    """
+    vectors = _tfidf_vectors(documents)
+    ids = list(vectors)
+    count = len(ids)
+    k = min(k, count - 1)
+    if k <= 0:
+        return {item_id: [] for item_id in ids}
+
+    vocabulary: Dict[str, int] = {}
+    rows, columns, weights = [], [], []
+    for row, item_id in enumerate(ids):
+        for word, weight in vectors[item_id].items():
+            rows.append(row)
+            columns.append(vocabulary.setdefault(word, len(vocabulary)))
+            weights.append(weight)
+    rows = numpy.array(rows, dtype=numpy.int64)
+    columns = numpy.array(columns, dtype=numpy.int64)
+    weights = numpy.array(weights, dtype=numpy.float64)
+    # Each item's own words, as one slice of the arrays (they were added item by item).
+    row_starts = numpy.searchsorted(rows, numpy.arange(count + 1))
+    # The postings: the same entries sorted by word, so each word's items are one slice.
+    order = numpy.argsort(columns, kind="stable")
+    posting_rows, posting_weights = rows[order], weights[order]
+    posting_starts = numpy.searchsorted(columns[order], numpy.arange(len(vocabulary) + 1))
+
+    top = {}
+    for row, item_id in enumerate(ids):
+        words = range(row_starts[row], row_starts[row + 1])
+        if not len(words):
+            top[item_id] = []
+            continue
+        others = numpy.concatenate([posting_rows[posting_starts[columns[i]]:posting_starts[columns[i] + 1]] for i in words])
+        products = numpy.concatenate([
+            posting_weights[posting_starts[columns[i]]:posting_starts[columns[i] + 1]] * weights[i] for i in words
+        ])
+        scores = numpy.bincount(others, weights=products, minlength=count)
+        scores[row] = 0.0
+        best = numpy.argpartition(-scores, k - 1)[:k]
+        best = best[numpy.argsort(-scores[best], kind="stable")]
+        top[item_id] = [(ids[other], float(scores[other])) for other in best if scores[other] > 0]
+    return top
+
+
+class RelatedIndex(CatalogIndex):
+    """The precomputed similar items and dynasty links for every catalog item."""
+
+    def __init__(self):
+        super().__init__()
+        # What each item's similarity is computed from: collection -> id -> word counts.
+        self._documents: Dict[str, Dict[int, Dict[str, float]]] = defaultdict(dict)
+        self._dynasties: Dict[str, Dict[int, Set[str]]] = defaultdict(dict)
+        # The results: collection -> id -> [(collection, id, score)], best first.
+        self._similar: Dict[str, Dict[int, List[Related]]] = {}
+        self._linked: Dict[str, Dict[int, List[Related]]] = {}
+        self._dirty: Set[str] = set()
+        # Held for a whole recompute, so two of them can't finish out of order.
+        self._compute_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _changed(self, collection: str):
+        self._dirty.add(collection)
+        self._wake.set()
+
+    def _add(self, collection: str, item: dict):
+        self._documents[collection][item["id"]] = _term_counts(collection, item)
+        if collection in DYNASTY_FIELDS:
+            self._dynasties[collection][item["id"]] = _dynasties(collection, item)
+        self._changed(collection)
+
+    def _remove(self, collection: str, item_id: int):
+        if self._documents[collection].pop(item_id, None) is not None:
+            self._dynasties[collection].pop(item_id, None)
+            self._changed(collection)
+
+    def _reset(self, collection: str, items: List[dict]):
+        self._documents[collection] = {}
+        self._dynasties[collection] = {}
+        for item in items:
+            self._add(collection, item)
+        self._changed(collection)
+
+    def _recompute(self):
+        """Recomputes the collections that have changed since the last run."""
+        with self._compute_lock:
+            self._recompute_changed()
+
+    def _recompute_changed(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            documents = {collection: dict(self._documents[collection]) for collection in dirty}
+            relink = bool(dirty & DYNASTY_FIELDS.keys())
+            dynasties = {collection: dict(self._dynasties[collection]) for collection in DYNASTY_FIELDS}
+        if not dirty:
+            return
+
+        # The heavy part runs without the lock, so requests keep getting the previous results meanwhile.
+        similar = {}
+        for collection, collection_documents in documents.items():
+            top = top_k_similar(collection_documents, RELATED_TOP_K)
+            similar[collection] = {
+                item_id: [(collection, other_id, score) for other_id, score in matches]
+                for item_id, matches in top.items()
+            }
+        linked = self._link_dynasties(dynasties) if relink else {}
+
+        with self._lock:
+            self._similar.update(similar)
+            self._linked.update(linked)
+
+    @staticmethod
+    def _link_dynasties(dynasties: Dict[str, Dict[int, Set[str]]]) -> Dict[str, Dict[int, List[Related]]]:
+        # dynasty -> collection -> ids
+        holders: Dict[str, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+        for collection, by_id in dynasties.items():
+            for item_id, keys in by_id.items():
+                for key in keys:
+                    holders[key][collection].append(item_id)
+        linked: Dict[str, Dict[int, List[Related]]] = {}
+        for collection, by_id in dynasties.items():
+            others = [other for other in DYNASTY_FIELDS if other != collection]
+            linked[collection] = {}
+            for item_id, keys in by_id.items():
+                # Items that share more of this item's dynasties come first.
+                shared: Counter = Counter()
+                for key in keys:
+                    for other in others:
+                        for other_id in holders[key][other]:
+                            shared[(other, other_id)] += 1
+                ranked = sorted(shared.items(), key=lambda pair: (-pair[1], pair[0]))
+                linked[collection][item_id] = [(other, other_id, float(count)) for (other, other_id), count in ranked]
+        return linked
+
+    def related(self, collection: str, item_id: int, limit: int) -> Optional[Tuple[List[Related], List[Related], bool]]:
+        """
+        The most similar items in the same collection, and the items in other collections
+        that share a dynasty with it, best first, and whether they're ready. If the
+        background thread hasn't got to this item yet, both lists are empty and ready is
+        False. None if there's no such item.
+        """
+        with self._lock:
+            if item_id not in self._documents[collection]:
+                return None
+            ready = item_id in self._similar.get(collection, {})
+            similar = self._similar.get(collection, {}).get(item_id, [])
+            linked = self._linked.get(collection, {}).get(item_id, [])
+        if not ready:
+            # Normally running since startup; this only matters if it was never started.
+            self.start()
+        return similar[:limit], linked[:limit], ready
+
+    def start(self):
+        """Starts the background thread that keeps the results up to date."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="catalog-related", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self._wake.wait(timeout=1.0):
+                continue
+            self._stop.wait(RELATED_DEBOUNCE_SECONDS)
+            self._wake.clear()
+            try:
+                self._recompute()
+            except Exception as e:
+                print(f"❌ Failed to compute related items: {e}")
+
+    def stop(self, timeout: float = 5.0):
+        """Stops the background thread. Called when the app shuts down."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+# The related items shared by every request in this worker.
+related_index = RelatedIndex()
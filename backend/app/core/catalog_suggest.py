@@ -0,0 +1,138 @@
+"""
+Typeahead suggestions for the search box, from an in-memory sorted index.
+
+Every name, dynasty, builder and era is normalized and stored in a sorted list, once
+from each word onwards ("brihadisvar templ", "templ"), so a keystroke becomes a binary
+search for the typed prefix. Normalizing folds away the usual differences in how Indian
+names are written in English: "Brihadeeswara", "Brihadisvara" and "Brihadishwara" all
+end up as "brihadisvar", and "Chola" matches "Cola".
+
+The index follows admin edits like the other catalog indexes, and the sorted list is
+rebuilt whenever the catalog has changed since it was last built.
+"""
+
+import bisect
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from .catalog_index import CatalogIndex
+
+# The phrases we suggest from each collection: (kind, field). List fields give one phrase per entry.
+SUGGEST_FIELDS = {
+    "temples": [("name", "name"), ("dynasty", "dynasty"), ("builder", "builder")],
+    "weapons": [("name", "name"), ("dynasty", "dynasty_context")],
+    "fossils": [("name", "name"), ("era", "era")],
+}
+
+# Applied in order, to each lowercase, accent-free word.
+TRANSLITERATION_RULES = [
+    (re.compile(r"sh"), "s"),  # Shiva / Siva
+    (re.compile(r"([bcdgjkpt])h"), r"\1"),  # Chola / Cola, Bhima / Bima
+    (re.compile(r"ee"), "i"),  # Brihadeeswara / Brihadisvara
+    (re.compile(r"oo"), "u"),  # Shoolpaneshwar / Shulpaneshwar
+    (re.compile(r"w"), "v"),  # Vishwanath / Vishvanath
+    (re.compile(r"z"), "j"),
+    (re.compile(r"q"), "k"),
+    (re.compile(r"(.)\1+"), r"\1"),  # Pallava / Palava, Somnaath / Somnath
+]
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# (kind, text, collection, item id). The id is only set for names; other phrases are shared by many items.
+Suggestion = Tuple[str, str, str, Optional[int]]
+
+
+def _normalize_word(word: str) -> str:
+    for pattern, replacement in TRANSLITERATION_RULES:
+        word = pattern.sub(replacement, word)
+    # A final "a" is often dropped in Hindi spellings: Rama / Ram, Shiva / Shiv.
+    if len(word) > 3 and word.endswith("a"):
+        word = word[:-1]
+    return word
+
+
+def normalize(text: str) -> List[str]:
+    """Splits text into words and folds each one to its spelling-independent form."""
+    folded = unicodedata.normalize("NFKD", (text or "").lower())
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+    return [_normalize_word(word) for word in _WORD.findall(folded)]
+
+
+def _phrases(collection: str, item: dict) -> List[Tuple[str, str]]:
+    phrases = []
+    for kind, field in SUGGEST_FIELDS[collection]:
+        value = item.get(field)
+        for text in value if isinstance(value, list) else [value]:
+            if text:
+                phrases.append((kind, str(text).strip()))
+    return phrases
+
+
+class SuggestIndex(CatalogIndex):
+    """Names, dynasties, builders and eras, sorted by their normalized words."""
+
+    def __init__(self):
+        super().__init__()
+        self._phrases: Dict[str, Dict[int, List[Tuple[str, str]]]] = {collection: {} for collection in SUGGEST_FIELDS}
+        self._keys: List[str] = []
+        self._entries: List[Tuple[str, int, Suggestion]] = []
+        self._dirty = True
+
+    def _add(self, collection: str, item: dict):
+        self._phrases[collection][item["id"]] = _phrases(collection, item)
+        self._dirty = True
+
+    def _remove(self, collection: str, item_id: int):
+        if self._phrases[collection].pop(item_id, None) is not None:
+            self._dirty = True
+
+    def _reset(self, collection: str, items: List[dict]):
+        self._phrases[collection] = {item["id"]: _phrases(collection, item) for item in items}
+        self._dirty = True
+
+    def _rebuild(self):
+        entries = []
+        for collection, by_id in self._phrases.items():
+            for item_id, phrases in by_id.items():
+                for kind, text in phrases:
+                    suggestion = (kind, text, collection, item_id if kind == "name" else None)
+                    words = normalize(text)
+                    # One key from each word onwards, so "temp" finds "Brihadeeswara Temple" too.
+                    for position in range(len(words)):
+                        entries.append((" ".join(words[position:]), position, suggestion))
+        entries.sort(key=lambda entry: entry[0])
+        self._entries = entries
+        self._keys = [entry[0] for entry in entries]
+        self._dirty = False
+
+    def suggest(self, query: str, collection: Optional[str] = None, limit: int = 10) -> List[Suggestion]:
+        """
+        The phrases that start with what was typed (at any word), best first: matches
+        at the start of a phrase before matches further in, then shorter phrases first.
+        """
+        words = normalize(query)
+        if not words:
+            return []
+        with self._lock:
+            if self._dirty:
+                self._rebuild()
+            start = bisect.bisect_left(self._keys, words[0])
+            end = bisect.bisect_left(self._keys, words[0] + "\uffff")
+            best: Dict[Suggestion, Tuple[int, int]] = {}
+            for key, position, suggestion in self._entries[start:end]:
+                if collection is not None and suggestion[2] != collection:
+                    continue
+                # Every typed word must start the matching word of the phrase, in order.
+                key_words = key.split(" ")
+                if len(key_words) < len(words) or not all(key_word.startswith(word) for key_word, word in zip(key_words, words)):
+                    continue
+                rank = (position, len(suggestion[1]))
+                if suggestion not in best or rank < best[suggestion]:
+                    best[suggestion] = rank
+        ranked = sorted(best, key=lambda suggestion: (best[suggestion], suggestion[1]))
+        return ranked[:limit]
+
+
+# The suggestion index shared by every request in this worker.
+suggest_index = SuggestIndex()
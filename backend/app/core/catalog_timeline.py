@@ -0,0 +1,102 @@
+"""
+The timeline: which temples and fossils fall within a range of years.
+
+Every dated item's (start year, end year, id) is kept in a list sorted by start year.
+An item overlaps a range if it starts before the range ends and ends after it starts,
+so a query is two binary searches for the slice of items that could overlap, and a
+check of each one's end year. No item can be longer than the longest one we have, so
+that slice starts at (range start - longest span).
+
+Items that run on to the present (no end year) are kept in a list of their own, sorted
+by start year too. Their end is this year, which we only fill in when answering a query,
+so they don't count towards the longest span and never go out of date.
+
+The years come from the `start_year` and `end_year` columns (see `chronology.py`), and
+the index is kept up to date through `catalog_index.py` like the others.
+"""
+
+import bisect
+import heapq
+import math
+from typing import Dict, List, Optional, Tuple
+
+from .catalog_index import CatalogIndex
+from .chronology import present_year
+
+# The collections with dates.
+TIMELINE_COLLECTIONS = ("temples", "fossils")
+
+# (start year, end year, id)
+Span = Tuple[int, int, int]
+
+
+class TimelineIndex(CatalogIndex):
+    """The dated items of each collection, sorted by when they start."""
+
+    def __init__(self):
+        super().__init__()
+        self._spans: Dict[str, List[Span]] = {collection: [] for collection in TIMELINE_COLLECTIONS}
+        # The items that run on to the present, as (start year, id).
+        self._open: Dict[str, List[Tuple[int, int]]] = {collection: [] for collection in TIMELINE_COLLECTIONS}
+        # Each item's span, with None for the end year of an open one.
+        self._by_id: Dict[str, Dict[int, Tuple[int, Optional[int], int]]] = {collection: {} for collection in TIMELINE_COLLECTIONS}
+        # The longest span in each collection. It only grows between rebuilds, which is safe.
+        self._longest: Dict[str, int] = {collection: 0 for collection in TIMELINE_COLLECTIONS}
+
+    def _add(self, collection: str, item: dict):
+        if collection not in self._spans or item.get("start_year") is None:
+            return
+        start, end = item["start_year"], item.get("end_year")
+        self._by_id[collection][item["id"]] = (start, end, item["id"])
+        if end is None:
+            bisect.insort(self._open[collection], (start, item["id"]))
+            return
+        bisect.insort(self._spans[collection], (start, end, item["id"]))
+        self._longest[collection] = max(self._longest[collection], end - start)
+
+    def _remove(self, collection: str, item_id: int):
+        span = self._by_id.get(collection, {}).pop(item_id, None)
+        if span is None:
+            return
+        start, end, _ = span
+        if end is None:
+            entries, entry = self._open[collection], (start, item_id)
+        else:
+            entries, entry = self._spans[collection], span
+        del entries[bisect.bisect_left(entries, entry)]
+
+    def _reset(self, collection: str, items: List[dict]):
+        if collection not in self._spans:
+            return
+        self._spans[collection] = []
+        self._open[collection] = []
+        self._by_id[collection] = {}
+        self._longest[collection] = 0
+        for item in items:
+            self._add(collection, item)
+
+    def query(self, collection: str, start: Optional[int] = None, end: Optional[int] = None) -> List[Span]:
+        """
+        The items that overlap the years `start` to `end` (either end may be left open),
+        as (start year, end year, id) in order of when they start. Items that run on to
+        the present end this year.
+        """
+        this_year = present_year()
+        with self._lock:
+            spans = self._spans[collection]
+            upper = len(spans) if end is None else bisect.bisect_right(spans, (end, math.inf))
+            if start is None:
+                closed = spans[:upper]
+            else:
+                lower = bisect.bisect_left(spans, (start - self._longest[collection],))
+                closed = [span for span in spans[lower:upper] if span[1] >= start]
+            opened = self._open[collection]
+            upper = len(opened) if end is None else bisect.bisect_right(opened, (end, math.inf))
+            current = [] if start is not None and start > this_year else [
+                (span_start, this_year, item_id) for span_start, item_id in opened[:upper]
+            ]
+        return list(heapq.merge(closed, current))
+
+
+# The timeline shared by every request in this worker.
+timeline_index = TimelineIndex()
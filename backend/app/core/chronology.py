@@ -0,0 +1,188 @@
+"""
+Helpers for reading the free-text dates in the catalog, like "11th Century AD (1010 AD)",
+"10th-13th Century AD" or "200-65 million years ago".
+
+Dates are turned into years on one scale: AD years are positive and BC years negative.
+Geological ages are counted back from year 0 ("200 million years ago" is -200,000,000);
+the two thousand years in between don't matter at that scale.
+
+Ranges that run on to the present ("540 million years ago - Present") are stored with
+no end year, since this year won't be this year for long. Whoever reads them fills in
+the present when they do (see `present_year`).
+"""
+
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# A start and end year, either of which may be unknown.
+YearRange = Tuple[Optional[int], Optional[int]]
+
+# A leading century, or range of centuries: "11th Century AD", "5th-6th Century AD", "3rd Century BC".
+_CENTURIES = re.compile(
+    r"^(\d+)(?:st|nd|rd|th)?(?:\s*-\s*(\d+)(?:st|nd|rd|th)?)?\s+century\b\s*(AD|CE|BC|BCE)?",
+    re.IGNORECASE,
+)
+
+
+def ordinal(number: int) -> str:
+    """1 -> "1st", 12 -> "12th", 22 -> "22nd"."""
+    if 10 <= number % 100 <= 20:
+        suffix = "th"
+    else:
+        suffix = {1: "st", 2: "nd", 3: "rd"}.get(number % 10, "th")
+    return f"{number}{suffix}"
+
+
+def century_label(century: int, era: str = "AD") -> str:
+    return f"{ordinal(century)} Century {era}"
+
+
+def parse_centuries(time_period: str) -> List[str]:
+    """
+    The centuries a temple's `time_period` covers, as labels like "11th Century AD".
+    A range like "10th-13th Century AD" covers every century in between. Periods that
+    don't start with a century ("Ancient (Renovated Multiple Times)") give an empty list.
+    """
+    match = _CENTURIES.match((time_period or "").strip())
+    if match is None:
+        return []
+    first = int(match[1])
+    last = int(match[2] or first)
+    era = "BC" if match[3] and match[3].upper().startswith("B") else "AD"
+    if era == "BC":
+        # BC centuries count down, so "5th-3rd Century BC" runs from 5 to 3.
+        first, last = max(first, last), min(first, last)
+        return [century_label(century, era) for century in range(first, last - 1, -1)]
+    return [century_label(century, era) for century in range(first, max(first, last) + 1)]
+
+
+# Years written out in brackets: "(1010 AD)", "(1025-1050 AD)", "(250 BC)".
+_YEARS = re.compile(r"\((\d{1,4})(?:\s*-\s*(\d{1,4}))?\s*(AD|CE|BC|BCE)\b", re.IGNORECASE)
+
+# An age: "200 million years ago", "200-65 million years ago", "540 million years ago - Present".
+_AGE = re.compile(
+    r"(\d+(?:\.\d+)?)(?:\s*-\s*(\d+(?:\.\d+)?))?\s*(thousand|million|billion)?\s*years?\s+ago(\s*-\s*present)?",
+    re.IGNORECASE,
+)
+_MULTIPLIERS = {None: 1, "thousand": 1_000, "million": 1_000_000, "billion": 1_000_000_000}
+
+# The geological eras and periods, as (started, ended) in millions of years ago.
+GEOLOGIC_TIME: Dict[str, Tuple[float, float]] = {
+    "precambrian": (4600, 538.8),
+    "paleozoic": (538.8, 251.9),
+    "cambrian": (538.8, 485.4),
+    "ordovician": (485.4, 443.8),
+    "silurian": (443.8, 419.2),
+    "devonian": (419.2, 358.9),
+    "carboniferous": (358.9, 298.9),
+    "permian": (298.9, 251.9),
+    "mesozoic": (251.9, 66),
+    "triassic": (251.9, 201.4),
+    "jurassic": (201.4, 145),
+    "cretaceous": (145, 66),
+    "cenozoic": (66, 0),
+    "paleogene": (66, 23.03),
+    "neogene": (23.03, 2.58),
+    "quaternary": (2.58, 0),
+    "pleistocene": (2.58, 0.0117),
+    "holocene": (0.0117, 0),
+}
+_GEOLOGIC_NAME = re.compile(r"\b(" + "|".join(GEOLOGIC_TIME) + r"|present)\b", re.IGNORECASE)
+
+
+def _year(number: int, era: Optional[str]) -> int:
+    return -number if era and era.upper().startswith("B") else number
+
+
+def present_year() -> int:
+    """This year, for the end of ranges that run on to the present."""
+    return datetime.utcnow().year
+
+
+def _ago(years_ago: float) -> int:
+    return -round(years_ago) if years_ago else present_year()
+
+
+def _ended_ago(years_ago: float) -> Optional[int]:
+    # Something that ended 0 years ago hasn't ended: it runs on to the present.
+    return _ago(years_ago) if years_ago else None
+
+
+def parse_time_period(time_period: str) -> YearRange:
+    """
+    The years a temple's `time_period` covers. Years written in brackets are used when
+    there are any ("11th Century AD (1010 AD)" gives 1010 to 1010); otherwise the whole
+    of the centuries ("10th-13th Century AD" gives 901 to 1300). When both are given and
+    the centuries run on further ("11th-13th Century AD (1031 AD)"), the range runs to
+    the end of the last century. Anything else gives (None, None).
+    """
+    text = (time_period or "").strip()
+    centuries = _CENTURIES.match(text)
+    century_range: YearRange = (None, None)
+    if centuries is not None:
+        first, last = int(centuries[1]), int(centuries[2] or centuries[1])
+        if centuries[3] and centuries[3].upper().startswith("B"):
+            # "5th-3rd Century BC" runs from 500 BC to 201 BC.
+            century_range = (-100 * max(first, last), -100 * (min(first, last) - 1) - 1)
+        else:
+            century_range = (100 * (first - 1) + 1, 100 * max(first, last))
+
+    years = _YEARS.search(text)
+    if years is None:
+        return century_range
+    start = _year(int(years[1]), years[3])
+    end = _year(int(years[2] or years[1]), years[3])
+    start, end = min(start, end), max(start, end)
+    if centuries is not None and centuries[2] and century_range[1] > end:
+        end = century_range[1]
+    return start, end
+
+
+def geologic_years(name: str) -> YearRange:
+    """The years of a geological era or period by name ("Jurassic", "Mesozoic Era"), or (None, None)."""
+    match = _GEOLOGIC_NAME.search(name or "")
+    if match is None or match[1].lower() == "present":
+        return None, None
+    started, ended = GEOLOGIC_TIME[match[1].lower()]
+    return _ago(started * 1_000_000), _ago(ended * 1_000_000)
+
+
+def parse_geologic_age(age_in_years: str, era: str = "") -> YearRange:
+    """
+    The years a fossil's `age_in_years` covers: "200-65 million years ago" gives
+    -200,000,000 to -65,000,000, and "... - Present" has no end year (it runs on to the
+    present). If the age can't be read, we fall back to the era's names ("Paleozoic Era -
+    Cenozoic Era").
+    """
+    match = _AGE.search((age_in_years or "").replace(",", ""))
+    if match is not None:
+        multiplier = _MULTIPLIERS[match[3] and match[3].lower()]
+        oldest = float(match[1]) * multiplier
+        youngest = float(match[2]) * multiplier if match[2] else oldest
+        oldest, youngest = max(oldest, youngest), min(oldest, youngest)
+        end = None if match[4] else _ended_ago(youngest)
+        return _ago(oldest), end
+
+    names = _GEOLOGIC_NAME.findall(era or "")
+    if not names:
+        return None, None
+    start = geologic_years(names[0])[0]
+    last = names[-1].lower()
+    end = None if last == "present" else _ended_ago(GEOLOGIC_TIME[last][1] * 1_000_000)
+    return start, end
+
+
+def chronology_columns(collection: str, item: dict) -> Dict[str, Optional[int]]:
+    """
+    The `start_year` and `end_year` columns for a catalog item, read from its free-text
+    dates. An item with a start year but no end year runs on to the present. Collections
+    without dates (weapons) have no such columns, so this is empty.
+    """
+    if collection == "temples":
+        start, end = parse_time_period(item.get("time_period"))
+    elif collection == "fossils":
+        start, end = parse_geologic_age(item.get("age_in_years"), item.get("era"))
+    else:
+        return {}
+    return {"start_year": start, "end_year": end}
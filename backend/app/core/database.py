@@ -1,4 +1,5 @@
-from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel import create_engine, Session
+from sqlalchemy.exc import OperationalError
 from typing import Generator
 import os
 import pymysql
@@ -82,17 +83,24 @@ def create_database_if_not_exists():
         print(f"\n❌ An unexpected error occurred while creating the database: {e}")
         sys.exit(1)
 
+def _can_connect(candidate) -> bool:
+    try:
+        with candidate.connect():
+            return True
+    except OperationalError:
+        return False
+
 def initialize_engine():
-    """Initializes the database engine after making sure the database exists."""
+    """
+    Initializes the database engine. We try to connect first, and only fall back to
+    checking (and creating) the database if that fails, so a normal start doesn't
+    need an extra connection to the MySQL server.
+    """
     global engine
     
     if engine is None:
-        # First things first, let's make sure the database is ready.
-        create_database_if_not_exists()
-        
-        # Now we can create the engine that connects to our database.
         print("Initializing database engine...")
-        engine = create_engine(
+        candidate = create_engine(
             DATABASE_URL,
             echo=False,  # Set this to True if you want to see the SQL queries.
             pool_pre_ping=True,
@@ -100,22 +108,14 @@ def initialize_engine():
             pool_size=5,
             max_overflow=10
         )
+        if not _can_connect(candidate):
+            # The database probably doesn't exist yet, so let's make sure it's there.
+            create_database_if_not_exists()
+        engine = candidate
         print("✓ Database engine initialized\n")
     
     return engine
 
-def create_db_and_tables():
-    """This function creates all the necessary database tables."""
-    global engine
-    
-    # We need to make sure the engine is initialized before we can create tables.
-    if engine is None:
-        initialize_engine()
-    
-    print("Creating database tables...")
-    SQLModel.metadata.create_all(engine)
-    print("✓ All tables created successfully!")
-
 def get_session() -> Generator[Session, None, None]:
     """This is a dependency that provides a database session for our API endpoints."""
     global engine
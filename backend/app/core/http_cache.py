@@ -0,0 +1,69 @@
+"""
+Small helpers for HTTP caching: building ETags and answering conditional requests
+with `304 Not Modified`, so repeat visitors don't download things they already have.
+"""
+
+import hashlib
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from fastapi.responses import Response
+
+
+def make_etag(prefix: str, content: bytes) -> str:
+    """Builds a strong ETag from a digest of the content."""
+    digest = hashlib.sha256(content).hexdigest()[:20]
+    return f'"{prefix}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Checks an `If-None-Match` header against our ETag.
+    The header can hold several ETags (or `*`), and browsers sometimes send weak ones,
+    which are fine to compare here because If-None-Match uses weak comparison.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == wanted for candidate in if_none_match.split(","))
+
+
+def unmodified_since(if_modified_since: Optional[str], modified_at: float) -> bool:
+    """
+    Checks an `If-Modified-Since` header against a file's modification time (a Unix
+    timestamp). HTTP dates only go down to the second, so we compare whole seconds.
+    """
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return since.timestamp() >= int(modified_at)
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """
+    Checks whether an `Accept-Encoding` header lets us send gzip. It may name gzip, or
+    allow anything with `*`, and either can be turned off with `;q=0`.
+    """
+    qualities = {}
+    for coding in (accept_encoding or "").split(","):
+        name, *params = [part.strip() for part in coding.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.lower()] = quality
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
+def not_modified(etag: str, headers: Optional[dict] = None) -> Response:
+    """A bodyless 304 response that repeats the validators the browser should keep."""
+    return Response(status_code=304, headers={"ETag": etag, **(headers or {})})
@@ -0,0 +1,161 @@
+"""
+Tiny blurred previews of our images, for the catalog.
+
+Until a temple's picture has downloaded, the gallery has nothing to draw, and the page
+jumps about as images arrive. So each catalog item also carries the image's pixel size
+and a placeholder: a thumbnail about 16 pixels across, inlined as a `data:` URI of a
+few hundred bytes. The frontend can lay out the page and paint the blurred preview
+straight away.
+
+Placeholders are made by a background thread, never during a request. They're keyed by
+the image's content hash and saved to PLACEHOLDER_CACHE_FILE, so a restart doesn't have
+to make them again. When new ones are ready, listeners (the catalog) are told, so the
+next catalog response includes them.
+"""
+
+import base64
+import io
+import json
+import os
+import queue
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from PIL import Image
+
+from .media_index import MediaFile, media_index
+
+PLACEHOLDER_CACHE_FILE = Path(os.getenv(
+    "PLACEHOLDER_CACHE_FILE",
+    str(Path(__file__).parent.parent / "cache" / "placeholders.json"),
+))
+
+# The longest side of a placeholder, in pixels. The browser scales it up and blurs it.
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 40
+
+# Once this many placeholders are ready, we tell the listeners even if more are queued.
+NOTIFY_BATCH_SIZE = 50
+
+
+@dataclass(frozen=True)
+class ImagePlaceholder:
+    width: int
+    height: int
+    data_uri: str
+
+
+def _make_placeholder(path: Path) -> ImagePlaceholder:
+    with Image.open(path) as image:
+        width, height = image.size
+        # For JPEGs, decode at a fraction of the size; we only need 16 pixels.
+        image.draft("RGB", (PLACEHOLDER_SIZE * 4, PLACEHOLDER_SIZE * 4))
+        preview = image.convert("RGB")
+        preview.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+        buffer = io.BytesIO()
+        preview.save(buffer, format="WEBP", quality=PLACEHOLDER_QUALITY)
+    encoded = base64.b64encode(buffer.getvalue()).decode("ascii")
+    return ImagePlaceholder(width, height, f"data:image/webp;base64,{encoded}")
+
+
+class ImagePlaceholders:
+    """Placeholders by content hash, plus the background thread that makes missing ones."""
+
+    def __init__(self, cache_file: Path):
+        self._cache_file = cache_file
+        self._placeholders: Dict[str, ImagePlaceholder] = {}
+        self._queue: "queue.Queue[Tuple[str, MediaFile]]" = queue.Queue()
+        self._queued: Set[str] = set()
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[Set[str]], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_listener(self, listener: Callable[[Set[str]], None]):
+        """Calls `listener` with the relative paths of images whose placeholders just became ready."""
+        self._listeners.append(listener)
+
+    def get(self, relative_path: str, media: MediaFile) -> Optional[ImagePlaceholder]:
+        """The placeholder for an image, or None if it isn't ready yet (it gets queued)."""
+        placeholder = self._placeholders.get(media.content_hash)
+        if placeholder is None:
+            self._enqueue(relative_path, media)
+        return placeholder
+
+    def _enqueue(self, relative_path: str, media: MediaFile):
+        with self._lock:
+            if media.content_hash in self._queued:
+                return
+            self._queued.add(media.content_hash)
+        self._queue.put((relative_path, media))
+
+    def _load(self):
+        try:
+            saved = json.loads(self._cache_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        for content_hash, (width, height, data_uri) in saved.items():
+            self._placeholders[content_hash] = ImagePlaceholder(width, height, data_uri)
+
+    def _save(self):
+        # Only keep placeholders for images we still have.
+        current = {media.content_hash for _, media in media_index.files("images/")}
+        data = {
+            content_hash: [placeholder.width, placeholder.height, placeholder.data_uri]
+            for content_hash, placeholder in self._placeholders.items()
+            if content_hash in current
+        }
+        try:
+            self._cache_file.parent.mkdir(parents=True, exist_ok=True)
+            descriptor, temp_name = tempfile.mkstemp(dir=self._cache_file.parent, suffix=".tmp")
+            with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+                json.dump(data, file)
+            os.replace(temp_name, self._cache_file)
+        except OSError as e:
+            print(f"⚠️  Could not save the image placeholders: {e}")
+
+    def start(self):
+        """Loads the saved placeholders and starts making any that are missing."""
+        self._load()
+        if self._thread is not None and self._thread.is_alive():
+            return
+        for relative_path, media in media_index.files("images/"):
+            if media.content_hash not in self._placeholders:
+                self._enqueue(relative_path, media)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="image-placeholders", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        ready: Set[str] = set()
+        while not self._stop.is_set():
+            try:
+                relative_path, media = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            try:
+                self._placeholders[media.content_hash] = _make_placeholder(media.path)
+                ready.add(relative_path)
+            except Exception as e:
+                print(f"❌ Failed to make a placeholder for {relative_path}: {e}")
+            finally:
+                with self._lock:
+                    self._queued.discard(media.content_hash)
+            if ready and (self._queue.empty() or len(ready) >= NOTIFY_BATCH_SIZE):
+                self._save()
+                for listener in self._listeners:
+                    listener(ready)
+                ready = set()
+
+    def stop(self, timeout: float = 5.0):
+        """Stops the background thread. Called when the app shuts down."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+# The placeholders shared by every request in this worker.
+image_placeholders = ImagePlaceholders(PLACEHOLDER_CACHE_FILE)
@@ -0,0 +1,158 @@
+"""
+Smaller versions of our images, made on demand (`?w=320&fmt=webp` on a media URL).
+
+The gallery shows thumbnails a few hundred pixels wide, but the JPEGs in `app/static`
+are full size. So `get_media` can ask for a resized and/or re-encoded copy instead.
+Each copy is made once, in a small pool of worker threads, and saved in
+IMAGE_VARIANT_CACHE_DIR under a name built from the source file's content hash and the
+parameters. Every later request is served straight from that file. When the source
+image changes, its hash changes, so stale copies are never used.
+
+Resizing is done with Pillow. When the pool is full, we simply send the original image.
+"""
+
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+from .media_index import MediaFile
+
+IMAGE_VARIANT_CACHE_DIR = Path(os.getenv(
+    "IMAGE_VARIANT_CACHE_DIR",
+    str(Path(__file__).parent.parent / "cache" / "image_variants"),
+))
+IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", "2"))
+# How many variants may wait for a worker before we fall back to the original image.
+IMAGE_VARIANT_MAX_QUEUE = int(os.getenv("IMAGE_VARIANT_MAX_QUEUE", "16"))
+
+# Requested widths are rounded up to one of these, so there's a small, fixed number
+# of copies per image no matter what the frontend asks for.
+VARIANT_WIDTHS = (160, 320, 480, 640, 960, 1280, 1920)
+
+# fmt parameter -> (Pillow format name, file extension, MIME type)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", "webp", "image/webp"),
+    "jpeg": ("JPEG", "jpg", "image/jpeg"),
+    "jpg": ("JPEG", "jpg", "image/jpeg"),
+    "png": ("PNG", "png", "image/png"),
+}
+
+VARIANT_QUALITY = 80
+
+
+def snap_width(width: int) -> int:
+    """Rounds a requested width up to the nearest width we make."""
+    for candidate in VARIANT_WIDTHS:
+        if width <= candidate:
+            return candidate
+    return VARIANT_WIDTHS[-1]
+
+
+def _format_for(media: MediaFile, fmt: Optional[str]) -> Tuple[str, str, str]:
+    if fmt is not None:
+        return VARIANT_FORMATS[fmt]
+    # Without a fmt, we keep the source's own format.
+    for pillow_format, extension, media_type in VARIANT_FORMATS.values():
+        if media_type == media.media_type:
+            return pillow_format, extension, media_type
+    return VARIANT_FORMATS["jpeg"]
+
+
+def _render(source: Path, target: Path, width: Optional[int], pillow_format: str):
+    """Runs in a worker thread. Pillow releases the GIL while it resizes and encodes."""
+    with Image.open(source) as image:
+        if width is not None:
+            # For JPEGs this lets the decoder skip detail we're about to throw away.
+            image.draft("RGB", (width, width * image.height // max(image.width, 1)))
+            image.thumbnail((width, image.height), Image.LANCZOS)
+        if pillow_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+            image = image.convert("RGBA")
+        # Write to a temporary file and rename it, so nobody ever reads half a file.
+        descriptor, temp_name = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                image.save(file, format=pillow_format, quality=VARIANT_QUALITY, optimize=True)
+            os.replace(temp_name, target)
+        except BaseException:
+            os.unlink(temp_name)
+            raise
+
+
+class ImageVariants:
+    """Makes resized copies of images in a bounded thread pool and keeps them on disk."""
+
+    def __init__(self, cache_dir: Path, workers: int, max_queue: int):
+        self._cache_dir = cache_dir
+        self._workers = workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        # Reentrant, because a job that's already finished runs its done-callback right away.
+        self._lock = threading.RLock()
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        # Variants being made right now, so a burst of requests for one image makes it only once.
+        self._in_flight: Dict[Path, Future] = {}
+
+    def variant_path(self, media: MediaFile, width: Optional[int], fmt: Optional[str]) -> Tuple[Path, str]:
+        """Where a variant lives in the cache, and its MIME type."""
+        _, extension, media_type = _format_for(media, fmt)
+        size = f"w{snap_width(width)}" if width is not None else "full"
+        return self._cache_dir / f"{media.content_hash[:32]}-{size}.{extension}", media_type
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="image-variant")
+        return self._pool
+
+    def _job_done(self, path: Path):
+        self._slots.release()
+        with self._lock:
+            self._in_flight.pop(path, None)
+
+    def get(self, media: MediaFile, width: Optional[int], fmt: Optional[str]) -> Optional[Tuple[Path, str]]:
+        """
+        The cached variant's path and MIME type, making it first if needed.
+        Returns None if we can't make it right now, in which case the caller sends the original.
+        """
+        path, media_type = self.variant_path(media, width, fmt)
+        if path.exists():
+            return path, media_type
+
+        with self._lock:
+            future = self._in_flight.get(path)
+            if future is None:
+                if not self._slots.acquire(blocking=False):
+                    return None
+                path.parent.mkdir(parents=True, exist_ok=True)
+                pillow_format = _format_for(media, fmt)[0]
+                snapped = snap_width(width) if width is not None else None
+                try:
+                    future = self._get_pool().submit(_render, media.path, path, snapped, pillow_format)
+                except Exception:
+                    self._slots.release()
+                    raise
+                self._in_flight[path] = future
+                future.add_done_callback(lambda _: self._job_done(path))
+        try:
+            future.result()
+        except Exception as e:
+            print(f"❌ Failed to make a {width}px {fmt or 'original-format'} copy of {media.path.name}: {e}")
+            return None
+        return path, media_type
+
+    def shutdown(self):
+        """Stops the worker threads. Called when the app shuts down."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        # Finishing jobs take the lock in their callbacks, so we wait for them outside it.
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+# The variant maker shared by every request in this worker.
+image_variants = ImageVariants(IMAGE_VARIANT_CACHE_DIR, IMAGE_VARIANT_WORKERS, IMAGE_VARIANT_MAX_QUEUE)
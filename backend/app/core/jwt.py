@@ -1,6 +1,11 @@
 from jose import JWTError, jwt
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
+import hashlib
+import os
+import threading
+import time
 
 # Here we're defining the secret key and algorithm for our JWTs.
 # It's important to keep the secret key safe in a real-world application.
@@ -8,6 +13,14 @@ SECRET_KEY = "your_secret_key_here"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+# The same token comes back with every request (and every image or audio file), so we
+# remember tokens we've already verified until they expire, instead of checking the
+# signature again each time.
+JWT_CACHE_MAX_SIZE = int(os.getenv("JWT_CACHE_MAX_SIZE", "4096"))
+
+_verified_tokens: "OrderedDict[bytes, tuple[float, dict]]" = OrderedDict()
+_verified_lock = threading.Lock()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """
     This function creates a new access token.
@@ -22,14 +35,39 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def _remember_token(key: bytes, payload: dict):
+    """Keeps a verified token until its `exp` claim. Tokens without one aren't cached."""
+    expires_at = payload.get("exp")
+    if not isinstance(expires_at, (int, float)) or JWT_CACHE_MAX_SIZE <= 0:
+        return
+    with _verified_lock:
+        _verified_tokens[key] = (float(expires_at), payload)
+        _verified_tokens.move_to_end(key)
+        while len(_verified_tokens) > JWT_CACHE_MAX_SIZE:
+            _verified_tokens.popitem(last=False)
+
 def decode_access_token(token: str):
     """
     This function decodes an access token.
     It's useful for verifying a token and getting the data stored inside.
     """
+    # We key the cache by a digest, so we never keep the raw tokens around in memory.
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    with _verified_lock:
+        cached = _verified_tokens.get(key)
+        if cached is not None:
+            expires_at, payload = cached
+            if time.time() < expires_at:
+                _verified_tokens.move_to_end(key)
+                return dict(payload)
+            # It has expired since we verified it, so it's no longer any good.
+            del _verified_tokens[key]
+            return None
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         # If the token is invalid or expired, we'll return None.
         return None
+    _remember_token(key, payload)
+    return dict(payload)
@@ -0,0 +1,238 @@
+"""
+An in-memory leaderboard for the game room.
+
+Instead of running `ORDER BY score DESC` over the whole `high_scores` table on every
+request, we keep each game mode's scores in a skip list that stays sorted as scores
+come in. It can answer "top K", "what rank is this player?" and "who is around rank N?"
+in O(log n).
+
+The board is seeded from the database at startup and updated by `create_high_score`.
+Other workers write scores too, so every few seconds we also pick up any rows with an
+id we haven't seen yet.
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlmodel import Session, func, select
+
+from ..db.models import HighScore
+
+# How often (in seconds) we check the database for scores saved by other workers.
+LEADERBOARD_REFRESH_SECONDS = float(os.getenv("LEADERBOARD_REFRESH_SECONDS", "5"))
+
+# Rows are committed slightly out of id order under load, so each refresh looks back
+# this many ids, in case a lower id was committed after we passed it.
+REFRESH_OVERLAP_IDS = 1000
+
+# The board that holds every game mode together, for requests without a game_mode.
+ALL_MODES = "*"
+
+_MAX_LEVEL = 32
+
+
+class _Node:
+    __slots__ = ("key", "value", "next", "width")
+
+    def __init__(self, key, value, level: int):
+        self.key = key
+        self.value = value
+        self.next: List[Optional["_Node"]] = [None] * level
+        # width[i] is how many positions forward next[i] is, so we can count ranks as we walk.
+        self.width: List[int] = [1] * level
+
+
+class RankedList:
+    """
+    A sorted skip list that also knows positions ("indexable skip list").
+    Inserts, rank lookups and lookups by position all take O(log n).
+    Keys must be unique and comparable.
+    """
+
+    def __init__(self):
+        self._head = _Node(None, None, _MAX_LEVEL)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _random_level() -> int:
+        level = 1
+        while level < _MAX_LEVEL and random.random() < 0.5:
+            level += 1
+        return level
+
+    def insert(self, key, value):
+        """Adds an item, keeping the list in order."""
+        update: List[_Node] = [self._head] * _MAX_LEVEL
+        steps = [0] * _MAX_LEVEL
+        node, position = self._head, 0
+        for level in reversed(range(_MAX_LEVEL)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            update[level] = node
+            steps[level] = position
+
+        new_level = self._random_level()
+        new_node = _Node(key, value, new_level)
+        new_position = position + 1
+        for level in range(new_level):
+            previous = update[level]
+            new_node.next[level] = previous.next[level]
+            previous.next[level] = new_node
+            new_node.width[level] = previous.width[level] - (new_position - steps[level]) + 1
+            previous.width[level] = new_position - steps[level]
+        # Links above the new node's height now jump over one more item.
+        for level in range(new_level, _MAX_LEVEL):
+            update[level].width[level] += 1
+        self._size += 1
+
+    def index_of(self, key) -> Optional[int]:
+        """The 0-based position of a key, or None if it isn't in the list."""
+        node, position = self._head, 0
+        for level in reversed(range(_MAX_LEVEL)):
+            while node.next[level] is not None and node.next[level].key <= key:
+                position += node.width[level]
+                node = node.next[level]
+        if node is self._head or node.key != key:
+            return None
+        return position - 1
+
+    def _node_at(self, index: int) -> _Node:
+        node, remaining = self._head, index + 1
+        for level in reversed(range(_MAX_LEVEL)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        return node
+
+    def slice(self, start: int, count: int) -> list:
+        """Up to `count` values starting at 0-based position `start`."""
+        if start < 0 or start >= self._size or count <= 0:
+            return []
+        node = self._node_at(start)
+        values = []
+        while node is not None and len(values) < count:
+            values.append(node.value)
+            node = node.next[0]
+        return values
+
+
+def _sort_key(score: HighScore) -> Tuple:
+    # Highest score first. On a tie, whoever got there first ranks higher.
+    return (-score.score, score.achieved_at, score.id)
+
+
+class Leaderboard:
+    """All the game modes' ranked lists, plus each player's best entry per mode."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._boards: Dict[str, RankedList] = {}
+        self._best: Dict[Tuple[str, int], Tuple] = {}
+        self._last_id = 0
+        self._recent_ids: Set[int] = set()
+        self._synced_at: Optional[float] = None
+
+    def _add_locked(self, score: HighScore):
+        if score.id in self._recent_ids or score.id <= self._last_id - REFRESH_OVERLAP_IDS:
+            return
+        self._recent_ids.add(score.id)
+        snapshot = HighScore(**score.model_dump())
+        key = _sort_key(snapshot)
+        for mode in (snapshot.game_mode, ALL_MODES):
+            self._boards.setdefault(mode, RankedList()).insert(key, snapshot)
+            best = self._best.get((mode, snapshot.user_id))
+            if best is None or key < best:
+                self._best[(mode, snapshot.user_id)] = key
+
+    def add(self, score: HighScore):
+        """Adds a freshly saved score. Scores we already have are ignored."""
+        with self._lock:
+            self._add_locked(score)
+            # So the next refresh starts after it, instead of reading it back.
+            self._last_id = max(self._last_id, score.id)
+
+    def refresh(self, session: Session, force: bool = False):
+        """
+        Loads any scores we haven't seen yet. At startup this loads the whole table;
+        afterwards it's a quick primary-key range query, at most every few seconds.
+        Usually nothing has changed, so we first count the ids in the look-back window,
+        and only read the rows if there are ones we don't have.
+        """
+        now = time.monotonic()
+        if not force and self._synced_at is not None and now - self._synced_at < LEADERBOARD_REFRESH_SECONDS:
+            return
+        self._synced_at = now
+        with self._lock:
+            since = max(self._last_id - REFRESH_OVERLAP_IDS, 0)
+            known = (self._last_id, sum(1 for score_id in self._recent_ids if score_id > since))
+        if not force:
+            newest, count = session.exec(
+                select(func.max(HighScore.id), func.count(HighScore.id)).where(HighScore.id > since)
+            ).one()
+            if (newest or 0, count) == known:
+                return
+        rows = session.exec(select(HighScore).where(HighScore.id > since).order_by(HighScore.id)).all()
+        with self._lock:
+            for row in rows:
+                self._add_locked(row)
+            if rows:
+                self._last_id = max(self._last_id, rows[-1].id)
+            # Ids older than the look-back window can't come up again, so we can forget them.
+            cutoff = self._last_id - REFRESH_OVERLAP_IDS
+            self._recent_ids = {score_id for score_id in self._recent_ids if score_id > cutoff}
+
+    def top(self, game_mode: Optional[str], limit: int) -> List[Tuple[int, HighScore]]:
+        """The best `limit` scores as (rank, score) pairs. Ranks start at 1."""
+        if limit <= 0:
+            return []
+        return self.around_rank(game_mode, 1, 0, limit - 1)
+
+    def around_rank(self, game_mode: Optional[str], rank: int, before: int, after: int) -> List[Tuple[int, HighScore]]:
+        """The entries from `before` places above `rank` to `after` places below it."""
+        with self._lock:
+            board = self._boards.get(game_mode or ALL_MODES)
+            if board is None:
+                return []
+            start = max(rank - 1 - before, 0)
+            count = (rank - 1 + after) - start + 1
+            return [(start + offset + 1, score) for offset, score in enumerate(board.slice(start, count))]
+
+    def user_rank(self, game_mode: Optional[str], user_id: int) -> Optional[Tuple[int, HighScore, int]]:
+        """The player's best (rank, score) in a mode, plus the total number of entries."""
+        mode = game_mode or ALL_MODES
+        with self._lock:
+            board = self._boards.get(mode)
+            key = self._best.get((mode, user_id))
+            if board is None or key is None:
+                return None
+            index = board.index_of(key)
+            return index + 1, board.slice(index, 1)[0], len(board)
+
+    def total(self, game_mode: Optional[str]) -> int:
+        with self._lock:
+            board = self._boards.get(game_mode or ALL_MODES)
+            return len(board) if board is not None else 0
+
+
+# The one leaderboard shared by every request in this worker.
+leaderboard = Leaderboard()
+
+
+def load_leaderboard():
+    """Seeds the leaderboard from the database. Runs once at startup."""
+    from .database import initialize_engine
+
+    try:
+        with Session(initialize_engine()) as session:
+            leaderboard.refresh(session, force=True)
+        print(f"✓ Leaderboard ready with {leaderboard.total(None)} scores")
+    except Exception as e:
+        # The board will fill itself on the next refresh, so this isn't fatal.
+        print(f"❌ Failed to load the leaderboard: {e}")
@@ -0,0 +1,316 @@
+"""
+An in-memory index of the files in `app/static`, plus a small cache of popular images.
+
+`get_media` used to check that a file exists, work out its MIME type and open it on
+every request. Now we walk `app/static` once at startup and remember each file's size,
+modification time, MIME type and content hash, so a request becomes a dictionary lookup.
+The hash gives us an ETag that only changes when the content does. A background thread
+checks the tree again every MEDIA_INDEX_REFRESH_SECONDS, and only files whose size or
+mtime changed get hashed again; requests never wait for a rescan.
+
+The hashes are saved to MEDIA_HASH_CACHE_FILE, keyed by path, size and mtime. A restart
+(or another worker) only has to hash the files that changed since, so a fast start
+doesn't spend its time reading every image and mp3 again.
+
+The hash also gives each file a fingerprint for its URL (`brihadeeswara.3f2a9c1b0d.jpg`).
+A fingerprinted URL always means the same bytes, so browsers may cache it forever; when
+the file changes, so does its URL, and listeners (the catalog) are told to rebuild.
+
+Small images are also kept in memory, in an LRU with a total byte budget, so the
+most popular temple pictures are served without touching the disk at all.
+"""
+
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import formatdate
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+STATIC_PATH = Path(__file__).parent.parent / "static"
+
+MEDIA_INDEX_REFRESH_SECONDS = float(os.getenv("MEDIA_INDEX_REFRESH_SECONDS", "10"))
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+MEDIA_CACHE_MAX_FILE_BYTES = int(os.getenv("MEDIA_CACHE_MAX_FILE_BYTES", str(512 * 1024)))
+MEDIA_HASH_CACHE_FILE = Path(os.getenv(
+    "MEDIA_HASH_CACHE_FILE",
+    str(Path(__file__).parent.parent / "cache" / "media_hashes.json"),
+))
+
+# The MIME types we send for our media, by file extension.
+MEDIA_TYPES = {
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "mp3": "audio/mpeg",
+    "wav": "audio/wav",
+}
+
+# How many hex digits of the content hash go into a fingerprinted filename.
+FINGERPRINT_LENGTH = 10
+_FINGERPRINTED_NAME = re.compile(rf"^(?P<stem>.+)\.(?P<fingerprint>[0-9a-f]{{{FINGERPRINT_LENGTH}}})(?P<suffix>\.[^.]+)$")
+
+
+def plain_name(filename: str) -> str:
+    """
+    The filename as it's stored in the catalog: without the fingerprint we add to media
+    URLs (`x.3f2a9c1b0d.jpg` -> `x.jpg`), or the category folder in front of it.
+    """
+    filename = filename.rsplit("/", 1)[-1]
+    match = _FINGERPRINTED_NAME.match(filename)
+    return f"{match['stem']}{match['suffix']}" if match else filename
+
+
+def guess_media_type(filename: str) -> str:
+    extension = filename.rsplit(".", 1)[-1].lower()
+    return MEDIA_TYPES.get(extension) or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class MediaFile:
+    """What we know about one file in `app/static`."""
+    path: Path
+    stat: os.stat_result
+    media_type: str
+    content_hash: str
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.content_hash[:20]}"'
+
+    @property
+    def last_modified(self) -> str:
+        return formatdate(self.stat.st_mtime, usegmt=True)
+
+    @property
+    def fingerprint(self) -> str:
+        return self.content_hash[:FINGERPRINT_LENGTH]
+
+
+class MediaIndex:
+    """Every file under a directory, keyed by its path relative to it (e.g. `images/temples/x.jpg`)."""
+
+    def __init__(self, root: Path, refresh_interval: float, hash_cache_file: Path):
+        self._root = root
+        self._refresh_interval = refresh_interval
+        self._hash_cache_file = hash_cache_file
+        self._files: Dict[str, MediaFile] = {}
+        self._scanned_at: Optional[float] = None
+        self._scan_lock = threading.Lock()
+        self._listeners: List[Callable[[Set[str]], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_listener(self, listener: Callable[[Set[str]], None]):
+        """Calls `listener` with the relative paths of the files that changed, after every rescan that finds some."""
+        self._listeners.append(listener)
+
+    def _load_saved_hashes(self) -> Dict[str, Tuple[int, int, str]]:
+        """The saved hashes, as {relative path: (size, mtime in ns, hash)}."""
+        try:
+            with open(self._hash_cache_file, encoding="utf-8") as file:
+                saved = json.load(file)
+            return {key: (size, mtime_ns, content_hash) for key, (size, mtime_ns, content_hash) in saved.items()}
+        except (OSError, ValueError, TypeError):
+            # Not saved yet, or unreadable; we'll hash the files and save a fresh copy.
+            return {}
+
+    def _save_hashes(self, files: Dict[str, MediaFile]):
+        data = {
+            key: [media.stat.st_size, media.stat.st_mtime_ns, media.content_hash]
+            for key, media in files.items()
+        }
+        try:
+            self._hash_cache_file.parent.mkdir(parents=True, exist_ok=True)
+            descriptor, temp_name = tempfile.mkstemp(dir=self._hash_cache_file.parent, suffix=".tmp")
+            with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+                json.dump(data, file)
+            os.replace(temp_name, self._hash_cache_file)
+        except OSError as e:
+            print(f"⚠️  Could not save the media hashes: {e}")
+
+    def scan(self) -> int:
+        """Walks the directory and updates the index. Returns how many files were added, changed or removed."""
+        with self._scan_lock:
+            return self._scan()
+
+    def _scan(self) -> int:
+        files: Dict[str, MediaFile] = {}
+        changed: Set[str] = set()
+        saved: Optional[Dict[str, Tuple[int, int, str]]] = None
+        hashed = 0
+        for directory, _, filenames in os.walk(self._root):
+            for filename in filenames:
+                path = Path(directory) / filename
+                key = path.relative_to(self._root).as_posix()
+                try:
+                    stat = path.stat()
+                    known = self._files.get(key)
+                    if known is not None and (known.stat.st_size, known.stat.st_mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                        files[key] = known
+                        continue
+                    # Another worker (or our last run) may have hashed this exact file already.
+                    if saved is None:
+                        saved = self._load_saved_hashes()
+                    size, mtime_ns, content_hash = saved.get(key, (None, None, None))
+                    if (size, mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+                        content_hash = _hash_file(path)
+                        hashed += 1
+                    files[key] = MediaFile(path, stat, guess_media_type(filename), content_hash)
+                except OSError:
+                    # The file went away while we were looking at it.
+                    continue
+                changed.add(key)
+        changed |= self._files.keys() - files.keys()
+        first_scan = self._scanned_at is None
+        # Swapping in the whole dictionary at once means readers never see a half-updated index.
+        self._files = files
+        self._scanned_at = time.monotonic()
+        if hashed:
+            self._save_hashes(files)
+        if changed and not first_scan:
+            for listener in self._listeners:
+                listener(changed)
+        return len(changed)
+
+    def ensure_scanned(self):
+        """Builds the index if that hasn't happened yet (it normally does at startup)."""
+        if self._scanned_at is None:
+            self.scan()
+            # Normally running since startup; this only matters if it was never started.
+            self.start()
+
+    def start(self):
+        """Starts the background thread that rescans the directory every MEDIA_INDEX_REFRESH_SECONDS."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="media-index", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self._refresh_interval):
+            try:
+                self.scan()
+            except Exception as e:
+                print(f"❌ Failed to rescan media files: {e}")
+
+    def stop(self, timeout: float = 5.0):
+        """Stops the background thread. Called when the app shuts down."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def get(self, relative_path: str) -> Optional[MediaFile]:
+        """Looks up a file by its path under `app/static`, or returns None if there's no such file."""
+        self.ensure_scanned()
+        return self._files.get(relative_path)
+
+    def lookup(self, directory: str, filename: str) -> Tuple[Optional[MediaFile], Optional[str]]:
+        """
+        Finds a file by its plain or fingerprinted name. Returns the file (or None) and
+        the fingerprint that was in the name, if there was one.
+        """
+        media = self.get(f"{directory}/{filename}")
+        if media is not None:
+            return media, None
+        match = _FINGERPRINTED_NAME.match(filename)
+        if match is None:
+            return None, None
+        return self.get(f"{directory}/{match['stem']}{match['suffix']}"), match["fingerprint"]
+
+    def files(self, prefix: str = "") -> List[Tuple[str, MediaFile]]:
+        """Every indexed file whose relative path starts with `prefix`."""
+        self.ensure_scanned()
+        return [(key, media) for key, media in self._files.items() if key.startswith(prefix)]
+
+    def versioned_name(self, directory: str, filename: str) -> str:
+        """The fingerprinted name for a file (`x.jpg` -> `x.3f2a9c1b0d.jpg`), or the plain name if we don't have it."""
+        media = self.get(f"{directory}/{filename}")
+        stem, dot, suffix = filename.rpartition(".")
+        if media is None or not dot:
+            return filename
+        return f"{stem}.{media.fingerprint}.{suffix}"
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+
+class MediaMemoryCache:
+    """The bytes of recently served small images, up to a total size budget."""
+
+    def __init__(self, max_bytes: int, max_file_bytes: int):
+        self._max_bytes = max_bytes
+        self._max_file_bytes = max_file_bytes
+        self._entries: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def cacheable(self, media: MediaFile) -> bool:
+        return media.media_type.startswith("image/") and media.stat.st_size <= min(self._max_file_bytes, self._max_bytes)
+
+    def get(self, media: MediaFile) -> Optional[bytes]:
+        """The file's content, from memory if we have it. Returns None for files we don't keep in memory."""
+        if not self.cacheable(media):
+            return None
+        key = str(media.path)
+        with self._lock:
+            cached = self._entries.get(key)
+            # The content hash tells us whether what we hold is still the current file.
+            if cached is not None and cached[0] == media.content_hash:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+        try:
+            body = media.path.read_bytes()
+        except OSError:
+            return None
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[1])
+            self._entries[key] = (media.content_hash, body)
+            self._size += len(body)
+            while self._size > self._max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+        return body
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"files": len(self._entries), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+
+# The index and image cache shared by every request in this worker.
+media_index = MediaIndex(STATIC_PATH, MEDIA_INDEX_REFRESH_SECONDS, MEDIA_HASH_CACHE_FILE)
+media_cache = MediaMemoryCache(MEDIA_CACHE_MAX_BYTES, MEDIA_CACHE_MAX_FILE_BYTES)
+
+
+def load_media_index():
+    """Builds the media index and starts the thread that keeps it up to date. Runs once at startup."""
+    try:
+        media_index.scan()
+        print(f"✓ Indexed {len(media_index)} media files")
+    except Exception as e:
+        # The index builds itself on the first media request instead, so this isn't fatal.
+        print(f"❌ Failed to index media files: {e}")
+    media_index.start()
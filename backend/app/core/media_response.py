@@ -0,0 +1,162 @@
+"""
+File responses that support HTTP Range requests, for the audio stories and images.
+
+When someone drags the audio player's seek bar, the browser asks for just the part of
+the file it needs (`Range: bytes=...`). Answering with `206 Partial Content` means we
+send that part instead of the whole mp3 again.
+
+Whole files go out through the server's `pathsend` extension when it has one (so the
+server can use sendfile), and otherwise, like byte ranges, in chunks read in a worker
+thread, so a slow disk never holds up the event loop. The size comes from the file we
+actually opened, not the one we indexed, in case it was replaced in between. Files we
+already hold in memory (see `MediaMemoryCache`) are sliced from there instead.
+"""
+
+import mimetypes
+import os
+from email.utils import formatdate
+from typing import Mapping, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+# How much of the file we hand to the server at a time.
+MEDIA_CHUNK_SIZE = 256 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested range starts past the end of the file."""
+
+
+def parse_byte_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Turns a `Range` header into a (start, end) pair, with `end` exclusive.
+    Returns None if the header should be ignored and the whole file sent: it isn't a
+    bytes range, it's malformed, or it asks for several ranges at once (which browsers
+    don't do for media). Raises RangeNotSatisfiable if it starts past the end of the file.
+    """
+    units, _, spec = range_header.partition("=")
+    if units.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if first == "":
+            # "bytes=-500" means the last 500 bytes.
+            length = int(last)
+            if length <= 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(size - length, 0), size
+        start = int(first)
+        end = int(last) + 1 if last else size
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if end <= start:
+        return None
+    return start, min(end, size)
+
+
+class MediaFileResponse(Response):
+    """Sends a file from disk, answering `Range` requests with 206 Partial Content."""
+
+    def __init__(
+        self,
+        path: str,
+        media_type: Optional[str] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        stat_result: Optional[os.stat_result] = None,
+        etag: Optional[str] = None,
+        status_code: int = 200,
+        content: Optional[bytes] = None,
+    ):
+        self.path = path
+        # The file's bytes, if the caller already has them in memory; None to read them from disk.
+        self.content = content
+        self.status_code = status_code
+        self.media_type = media_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.background = None
+        self.stat_result = stat_result or os.stat(path)
+        self.init_headers(headers)
+        self.headers.setdefault("accept-ranges", "bytes")
+        self.headers.setdefault("content-length", str(self.stat_result.st_size))
+        self.headers.setdefault("last-modified", formatdate(self.stat_result.st_mtime, usegmt=True))
+        self.headers.setdefault("etag", etag or f'"{self.stat_result.st_mtime_ns:x}-{self.stat_result.st_size:x}"')
+
+    def _range_allowed(self, if_range: Optional[str]) -> bool:
+        # With If-Range, the browser only wants a piece if the file is still the one it
+        # has the rest of. Otherwise we send the whole (new) file.
+        if if_range is None:
+            return True
+        return if_range.strip() in (self.headers["etag"], self.headers["last-modified"])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if self.content is not None:
+            await self._respond(scope, send, len(self.content), None)
+            return
+        async with await anyio.open_file(self.path, "rb") as file:
+            stat_result = await anyio.to_thread.run_sync(os.fstat, file.wrapped.fileno())
+            await self._respond(scope, send, stat_result.st_size, file)
+
+    async def _respond(self, scope: Scope, send: Send, size: int, file):
+        request_headers = Headers(scope=scope)
+        headers_only = scope.get("method", "GET").upper() == "HEAD"
+        headers = MutableHeaders(raw=list(self.raw_headers))
+        headers["content-length"] = str(size)
+        status, start, end = self.status_code, 0, size
+
+        range_header = request_headers.get("range")
+        if range_header and self.status_code == 200 and self._range_allowed(request_headers.get("if-range")):
+            try:
+                byte_range = parse_byte_range(range_header, size)
+            except RangeNotSatisfiable:
+                await self._send_unsatisfiable(send, size)
+                return
+            if byte_range is not None:
+                status, (start, end) = 206, byte_range
+                headers["content-range"] = f"bytes {start}-{end - 1}/{size}"
+                headers["content-length"] = str(end - start)
+
+        await send({"type": "http.response.start", "status": status, "headers": headers.raw})
+        if headers_only or start == end:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif file is None:
+            await send({"type": "http.response.body", "body": self.content[start:end], "more_body": False})
+        elif status != 206 and "http.response.pathsend" in scope.get("extensions", {}):
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+        else:
+            await self._send_chunks(send, file, start, end)
+
+    async def _send_chunks(self, send: Send, file, start: int, end: int):
+        await file.seek(start)
+        position = start
+        while position < end:
+            chunk = await file.read(min(MEDIA_CHUNK_SIZE, end - position))
+            # An empty read means the file got shorter while we were sending it; there's nothing more to send.
+            position = end if not chunk else position + len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": position < end})
+
+    async def _send_unsatisfiable(self, send: Send, size: int):
+        headers = MutableHeaders(raw=[
+            (key, value) for key, value in self.raw_headers
+            if key not in (b"content-length", b"content-type")
+        ])
+        headers["content-range"] = f"bytes */{size}"
+        headers["content-length"] = "0"
+        await send({"type": "http.response.start", "status": 416, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class RangeStaticFiles(StaticFiles):
+    """StaticFiles for the `/static` mount, sending files with MediaFileResponse."""
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        response = MediaFileResponse(str(full_path), stat_result=stat_result, status_code=status_code)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 from datetime import datetime
 
 # ===============================================
@@ -47,6 +47,11 @@ class TempleOut(BaseModel):
     static_image_url: str
     model_3d_embed: Optional[str] = None  # This will be the Sketchfab model ID.
     audio_story_url: str
+    image_width: Optional[int] = None  # The image's size in pixels, so the page can be laid out before it loads
+    image_height: Optional[int] = None
+    image_placeholder: Optional[str] = None  # A tiny blurred preview of the image, as a data: URI
+    start_year: Optional[int] = None  # The years time_period covers, BC as negative numbers
+    end_year: Optional[int] = None  # None with a start year: it runs on to the present
 
 class TempleCreate(BaseModel):
     """The data required to add a new temple to our collection."""
@@ -75,6 +80,9 @@ class WeaponOut(BaseModel):
     image_url: str
     model_3d_embed: Optional[str] = None  # Sketchfab ID, if we have one.
     audio_story_url: str
+    image_width: Optional[int] = None  # The image's size in pixels, so the page can be laid out before it loads
+    image_height: Optional[int] = None
+    image_placeholder: Optional[str] = None  # A tiny blurred preview of the image, as a data: URI
 
 class WeaponCreate(BaseModel):
     """The information needed to add a new weapon."""
@@ -103,6 +111,11 @@ class FossilOut(BaseModel):
     image_url: str
     model_3d_embed: Optional[str] = None
     audio_story_url: str
+    image_width: Optional[int] = None  # The image's size in pixels, so the page can be laid out before it loads
+    image_height: Optional[int] = None
+    image_placeholder: Optional[str] = None  # A tiny blurred preview of the image, as a data: URI
+    start_year: Optional[int] = None  # The years age_in_years covers, counted back from year 0
+    end_year: Optional[int] = None  # None with a start year: it runs on to the present
 
 class FossilCreate(BaseModel):
     """The data required to add a new fossil to our collection."""
@@ -116,6 +129,102 @@ class FossilCreate(BaseModel):
     model_3d_embed: Optional[str] = None
     audio_story_url: str
 
+# ===============================================
+# Catalog Page Schema
+# A slice of a catalog collection, for paginated requests.
+# ===============================================
+
+class CatalogPage(BaseModel):
+    """One page of temples, weapons or fossils. Items only carry the requested fields."""
+    items: List[dict]
+    next_cursor: Optional[str] = None  # Pass this back as `cursor` to get the next page.
+    total: Optional[int] = None  # With filters: how many items match, across all pages
+    facets: Optional[Dict[str, Dict[str, int]]] = None  # With filters: facet -> value -> number of items
+
+# The names of the catalog collections, as used in URLs.
+CatalogCollection = Literal["temples", "weapons", "fossils"]
+
+# ===============================================
+# Catalog Bundle Schemas
+# The whole catalog in one response, for the first page load.
+# ===============================================
+
+class MediaManifestEntry(BaseModel):
+    """A media file the catalog refers to, so the frontend can decide what to preload."""
+    size: int  # In bytes
+    type: str  # e.g. image/jpeg
+
+class CatalogBundleOut(BaseModel):
+    """Every collection, plus the media they use (images and audio, by the URL the items use)."""
+    version: str  # Changes whenever anything in the bundle does
+    temples: List[TempleOut]
+    weapons: List[WeaponOut]
+    fossils: List[FossilOut]
+    media: Dict[str, Dict[str, MediaManifestEntry]]
+
+# ===============================================
+# Search Schemas
+# Full-text search over the whole catalog.
+# ===============================================
+
+class SearchHit(BaseModel):
+    """One search result: which item matched, how well, and the item itself."""
+    collection: CatalogCollection
+    id: int
+    score: float
+    item: dict  # The same fields as the collection's list endpoint returns
+
+class SearchResults(BaseModel):
+    """The best matches for a search, best first."""
+    query: str
+    total: int  # How many items matched in all, not just the ones returned
+    results: List[SearchHit]
+
+class Suggestion(BaseModel):
+    """One typeahead suggestion: a name, dynasty, builder or era from the catalog."""
+    text: str
+    kind: Literal["name", "dynasty", "builder", "era"]
+    collection: CatalogCollection
+    id: Optional[int] = None  # Only for names: the item it names
+
+class SuggestResults(BaseModel):
+    """Typeahead suggestions for what's been typed so far, best first."""
+    query: str
+    suggestions: List[Suggestion]
+
+class RelatedItem(BaseModel):
+    """An item related to the one being viewed."""
+    collection: CatalogCollection
+    id: int
+    score: float  # For similar items, the cosine similarity; for linked ones, how many dynasties they share
+    item: dict  # The same fields as the collection's list endpoint returns
+
+class RelatedItems(BaseModel):
+    """What to show next to an item: the most similar items, and items from the same dynasty."""
+    collection: CatalogCollection
+    id: int
+    similar: List[RelatedItem]  # From the same collection, most similar first
+    linked: List[RelatedItem]  # Temples and weapons that share a dynasty with this item
+    ready: bool = True  # False (with empty lists) while they're still being worked out; ask again shortly
+
+# The collections with dates, which can be put on a timeline.
+TimelineCollection = Literal["temples", "fossils"]
+
+class TimelineItem(BaseModel):
+    """An item on the timeline, with the years it covers (BC as negative numbers)."""
+    id: int
+    start_year: int
+    end_year: int  # This year, for items that run on to the present
+    item: dict  # The same fields as the collection's list endpoint returns
+
+class TimelineResults(BaseModel):
+    """The items that fall within a range of years, in order of when they start."""
+    collection: TimelineCollection
+    start: Optional[int] = None  # The range that was asked for; None means open-ended
+    end: Optional[int] = None
+    total: int  # How many items fall in the range, not just the ones returned
+    items: List[TimelineItem]
+
 # ===============================================
 # Visit Schemas
 # Tracks museum visits.
@@ -150,6 +259,21 @@ class HighScoreOut(BaseModel):
     game_mode: str
     achieved_at: datetime
 
+class LeaderboardEntryOut(BaseModel):
+    """A score together with its place on the leaderboard (1 is the top)."""
+    rank: int
+    id: int
+    user_id: int
+    score: int
+    game_mode: str
+    achieved_at: datetime
+
+class LeaderboardRankOut(BaseModel):
+    """Where a player's best score sits on a leaderboard."""
+    game_mode: Optional[str] = None  # None means all game modes together.
+    total_entries: int
+    entry: LeaderboardEntryOut
+
 # ===============================================
 # Feedback Schemas
 # User feedback about the experience.
@@ -1,4 +1,20 @@
+import asyncio
 import bcrypt
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# bcrypt is deliberately slow (~250 ms per check), so logins and sign-ups do their password
+# work in a small, separate pool of processes. That way a rush of logins can't tie up the
+# threads that serve the rest of the museum.
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", "2"))
+# How many password jobs may wait for a free worker before we start turning requests away.
+PASSWORD_POOL_MAX_QUEUE = int(os.getenv("PASSWORD_POOL_MAX_QUEUE", "32"))
+
+class PasswordPoolBusy(Exception):
+    """Raised when the password pool is full and the caller should try again shortly."""
 
 def hash_password(password: str) -> str:
     """
@@ -20,3 +36,106 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     plain_bytes = plain_password.encode('utf-8')[:72]
     hashed_bytes = hashed_password.encode('utf-8')
     return bcrypt.checkpw(plain_bytes, hashed_bytes)
+
+# ===============================================
+# Password Worker Pool
+# ===============================================
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_POOL_WORKERS + PASSWORD_POOL_MAX_QUEUE)
+_stats_lock = threading.Lock()
+_stats = {
+    "completed": 0,
+    "failed": 0,
+    "rejected": 0,
+    "in_flight": 0,
+    "total_wait_seconds": 0.0,
+    "max_wait_seconds": 0.0,
+}
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PASSWORD_POOL_WORKERS)
+        return _pool
+
+def _timed_call(func, *args):
+    """Runs inside a worker process. We note when the job actually started, to measure queueing."""
+    return time.time(), func(*args)
+
+def _job_done(future: Future, submitted_at: float):
+    _slots.release()
+    with _stats_lock:
+        _stats["in_flight"] -= 1
+        if future.cancelled() or future.exception() is not None:
+            _stats["failed"] += 1
+            return
+        started_at, _ = future.result()
+        wait = max(started_at - submitted_at, 0.0)
+        _stats["completed"] += 1
+        _stats["total_wait_seconds"] += wait
+        _stats["max_wait_seconds"] = max(_stats["max_wait_seconds"], wait)
+
+def _submit(func, *args) -> Future:
+    """Hands a job to the pool, or raises PasswordPoolBusy straight away if it's full."""
+    global _pool
+    if not _slots.acquire(blocking=False):
+        with _stats_lock:
+            _stats["rejected"] += 1
+        raise PasswordPoolBusy()
+    
+    with _stats_lock:
+        _stats["in_flight"] += 1
+    submitted_at = time.time()
+    try:
+        try:
+            future = _get_pool().submit(_timed_call, func, *args)
+        except BrokenProcessPool:
+            # A worker died (for example, it ran out of memory). Start a fresh pool and try once more.
+            with _pool_lock:
+                _pool = None
+            future = _get_pool().submit(_timed_call, func, *args)
+    except Exception:
+        _slots.release()
+        with _stats_lock:
+            _stats["in_flight"] -= 1
+            _stats["failed"] += 1
+        raise
+    future.add_done_callback(lambda f: _job_done(f, submitted_at))
+    return future
+
+async def hash_password_async(password: str) -> str:
+    """Like `hash_password`, but runs in the password pool and can be awaited."""
+    _, hashed = await asyncio.wrap_future(_submit(hash_password, password))
+    return hashed
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Like `verify_password`, but runs in the password pool and can be awaited."""
+    _, valid = await asyncio.wrap_future(_submit(verify_password, plain_password, hashed_password))
+    return valid
+
+def get_password_pool_stats() -> dict:
+    """Numbers about the password pool, for the admin dashboard."""
+    with _stats_lock:
+        stats = dict(_stats)
+    finished = stats["completed"] or 1
+    return {
+        "workers": PASSWORD_POOL_WORKERS,
+        "max_queue": PASSWORD_POOL_MAX_QUEUE,
+        "in_flight": stats["in_flight"],
+        "completed": stats["completed"],
+        "failed": stats["failed"],
+        "rejected": stats["rejected"],
+        "average_wait_ms": round(stats["total_wait_seconds"] / finished * 1000, 2),
+        "max_wait_ms": round(stats["max_wait_seconds"] * 1000, 2),
+    }
+
+def shutdown_password_pool():
+    """Stops the worker processes. Called when the app shuts down."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
@@ -0,0 +1,106 @@
+"""
+Keeps the JSON files in `app/data` in step with the database, in the background.
+
+Admins often make a string of edits in a row. Rewriting a whole JSON file after every
+edit, inside the request, is wasted work. So the CRUD functions just call `schedule()`,
+and a background thread writes the file once things go quiet: after SNAPSHOT_DEBOUNCE_SECONDS
+without another edit, or at most SNAPSHOT_MAX_DELAY_SECONDS after the first one.
+The writing itself (atomic replace, skipping unchanged content) lives in `crud.py`.
+"""
+
+import atexit
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+SNAPSHOT_DEBOUNCE_SECONDS = float(os.getenv("SNAPSHOT_DEBOUNCE_SECONDS", "2"))
+SNAPSHOT_MAX_DELAY_SECONDS = float(os.getenv("SNAPSHOT_MAX_DELAY_SECONDS", "10"))
+
+
+class SnapshotWriter:
+    """Collects "this collection changed" notes and writes each JSON file once per burst."""
+
+    def __init__(self, debounce: float, max_delay: float):
+        self._debounce = debounce
+        self._max_delay = max_delay
+        # collection -> (time of the first pending edit, time of the latest one)
+        self._pending: Dict[str, Tuple[float, float]] = {}
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._exit_hook_registered = False
+
+    def schedule(self, collection: str):
+        """Notes that a collection changed. The file gets written a little later."""
+        now = time.monotonic()
+        with self._condition:
+            first, _ = self._pending.get(collection, (now, now))
+            self._pending[collection] = (first, now)
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+                self._thread.start()
+                if not self._exit_hook_registered:
+                    atexit.register(self.stop)
+                    self._exit_hook_registered = True
+            self._condition.notify()
+
+    def _due(self, now: float) -> Tuple[List[str], Optional[float]]:
+        """Which collections should be written now, and how long until the next one is due."""
+        due, wait = [], None
+        for collection, (first, last) in self._pending.items():
+            ready_at = min(last + self._debounce, first + self._max_delay)
+            if self._stopping or ready_at <= now:
+                due.append(collection)
+            else:
+                wait = ready_at - now if wait is None else min(wait, ready_at - now)
+        return due, wait
+
+    def _run(self):
+        while True:
+            with self._condition:
+                due, wait = self._due(time.monotonic())
+                while not due:
+                    if self._stopping and not self._pending:
+                        return
+                    self._condition.wait(wait)
+                    due, wait = self._due(time.monotonic())
+                for collection in due:
+                    del self._pending[collection]
+            for collection in due:
+                try:
+                    self._write(collection)
+                except Exception as e:
+                    # The database or disk may be back in a moment, so we keep the thread
+                    # going and try this collection again after the usual delay.
+                    print(f"❌ Failed to write the {collection} snapshot: {e}")
+                    self._retry(collection)
+
+    def _retry(self, collection: str):
+        with self._condition:
+            if self._stopping:
+                print(f"⚠️  Giving up on the {collection} snapshot, as we're shutting down")
+                return
+            now = time.monotonic()
+            first, last = self._pending.get(collection, (now, now))
+            self._pending[collection] = (first, last)
+
+    @staticmethod
+    def _write(collection: str):
+        # Imported here because crud.py imports this module.
+        from ..db.crud import sync_collection_to_json
+        sync_collection_to_json(collection)
+
+    def stop(self, timeout: float = 30.0):
+        """Writes anything still pending, then stops the thread. Called at shutdown."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+
+# The one snapshot writer shared by every request in this worker.
+snapshot_writer = SnapshotWriter(SNAPSHOT_DEBOUNCE_SECONDS, SNAPSHOT_MAX_DELAY_SECONDS)
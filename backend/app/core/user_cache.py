@@ -0,0 +1,96 @@
+"""
+A small in-memory cache of logged-in users, so protected endpoints don't have to
+look the user up in MySQL on every single request.
+
+Entries are keyed by the `id` claim in the JWT and expire after a short TTL. When a
+user's `is_admin` or `is_active` flag changes, call `invalidate_user`. Since scripts
+like `create_admin.py` run in their own process, invalidation is also broadcast
+through a small "epoch" file: every worker drops its cache when that file changes.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from ..db.models import User
+
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_EPOCH_FILE = Path(os.getenv(
+    "USER_CACHE_EPOCH_FILE",
+    str(Path(tempfile.gettempdir()) / "temple_museum_user_cache.epoch"),
+))
+
+# We only look at the epoch file this often, so the check stays nearly free.
+EPOCH_CHECK_INTERVAL_SECONDS = 1.0
+
+_users: "OrderedDict[int, tuple[float, User]]" = OrderedDict()
+_lock = threading.Lock()
+_epoch_seen: Optional[int] = None
+_epoch_checked_at = 0.0
+
+
+def _read_epoch() -> Optional[int]:
+    try:
+        return USER_CACHE_EPOCH_FILE.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _check_epoch():
+    """Clears the cache if another process has touched the epoch file since we last looked."""
+    global _epoch_seen, _epoch_checked_at
+    now = time.monotonic()
+    if now - _epoch_checked_at < EPOCH_CHECK_INTERVAL_SECONDS:
+        return
+    _epoch_checked_at = now
+    epoch = _read_epoch()
+    if epoch != _epoch_seen:
+        with _lock:
+            _users.clear()
+        _epoch_seen = epoch
+
+
+def get_cached_user(user_id: int) -> Optional[User]:
+    """Returns the cached user for this id, or None if we need to ask the database."""
+    _check_epoch()
+    with _lock:
+        cached = _users.get(user_id)
+        if cached is None:
+            return None
+        expires_at, user = cached
+        if time.monotonic() > expires_at:
+            del _users[user_id]
+            return None
+        _users.move_to_end(user_id)
+        return user
+
+
+def cache_user(user: User):
+    """
+    Remembers a user we just loaded. We keep a detached copy, so it doesn't hold on
+    to the request's database session.
+    """
+    snapshot = User(**user.model_dump())
+    with _lock:
+        _users[user.id] = (time.monotonic() + USER_CACHE_TTL_SECONDS, snapshot)
+        _users.move_to_end(user.id)
+        while len(_users) > USER_CACHE_MAX_SIZE:
+            _users.popitem(last=False)
+
+
+def invalidate_user(user_id: int):
+    """
+    Forgets a user, here and in every other worker. Call this after changing
+    a user's `is_admin` or `is_active` flag.
+    """
+    with _lock:
+        _users.pop(user_id, None)
+    try:
+        USER_CACHE_EPOCH_FILE.write_text(str(time.time_ns()))
+    except OSError as e:
+        print(f"⚠️  Could not update the user cache epoch file: {e}")
@@ -0,0 +1,140 @@
+"""
+A write-behind buffer for room visits.
+
+Every room a visitor walks into sends a `track-visit` ping. That makes it our busiest
+write, and writing each ping straight away (INSERT, COMMIT, refresh) would tie up a pool
+connection every time. Instead, pings go into an in-memory queue and return
+immediately. A background thread writes them in batches with one multi-row INSERT,
+either when a batch fills up or when the oldest ping has waited long enough.
+
+The queue has a fixed size. If it fills up (say, the database is down), new pings wait
+a moment and are then turned away, rather than using more and more memory. Anything
+still queued is written out when the app shuts down.
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from sqlmodel import Session
+
+VISIT_BUFFER_MAX_SIZE = int(os.getenv("VISIT_BUFFER_MAX_SIZE", "10000"))
+VISIT_FLUSH_BATCH_SIZE = int(os.getenv("VISIT_FLUSH_BATCH_SIZE", "500"))
+VISIT_FLUSH_INTERVAL_SECONDS = float(os.getenv("VISIT_FLUSH_INTERVAL_SECONDS", "2"))
+
+# When the queue is full, a ping waits this long for room before we give up on it.
+ENQUEUE_TIMEOUT_SECONDS = 0.05
+
+
+class VisitBufferFull(Exception):
+    """Raised when the visit queue is full and the caller should try again later."""
+
+
+class VisitBuffer:
+    """Collects visits in memory and writes them to the database in batches."""
+
+    def __init__(self, max_size: int, batch_size: int, flush_interval: float):
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=max_size)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._exit_hook_registered = False
+        self.written = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def start(self):
+        """Starts the background writer, if it isn't running already."""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="visit-buffer", daemon=True)
+            self._thread.start()
+            if not self._exit_hook_registered:
+                # If the server exits without running its shutdown hooks, we still want to write what we have.
+                atexit.register(self.stop)
+                self._exit_hook_registered = True
+
+    def record(self, user_id: int, room_visited: str):
+        """Queues a visit. Raises VisitBufferFull if there's no room for it."""
+        if self._thread is None or not self._thread.is_alive():
+            # Normally running since startup, but it may have been stopped since (a reload, say).
+            self.start()
+        visit = {"user_id": user_id, "room_visited": room_visited, "visited_at": datetime.utcnow()}
+        try:
+            self._queue.put(visit, timeout=ENQUEUE_TIMEOUT_SECONDS)
+        except queue.Full:
+            self.rejected += 1
+            raise VisitBufferFull()
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _next_batch(self) -> List[dict]:
+        """Waits for the first visit, then keeps collecting until the batch is full or old enough."""
+        try:
+            first = self._queue.get(timeout=self._flush_interval)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self._flush_interval
+        while len(batch) < self._batch_size and not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self) -> List[dict]:
+        batch = []
+        while len(batch) < self._batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[dict]):
+        # Imported here so this module doesn't depend on the CRUD layer at import time.
+        from ..db.crud import create_visits_bulk
+        from .database import initialize_engine
+
+        try:
+            with Session(initialize_engine()) as session:
+                create_visits_bulk(session, batch)
+            self.written += len(batch)
+        except Exception as e:
+            # We can't hold on to visits forever, so a failed batch is logged and dropped.
+            self.failed += len(batch)
+            print(f"❌ Failed to save {len(batch)} room visits: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    def stop(self, timeout: float = 10.0):
+        """Stops the writer and saves everything that's still queued."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        while True:
+            batch = self._drain()
+            if not batch:
+                break
+            self._write(batch)
+
+
+# The one visit buffer shared by every request in this worker.
+visit_buffer = VisitBuffer(VISIT_BUFFER_MAX_SIZE, VISIT_FLUSH_BATCH_SIZE, VISIT_FLUSH_INTERVAL_SECONDS)
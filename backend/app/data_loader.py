@@ -1,13 +1,30 @@
 """
 This is a handy utility for loading our initial data from JSON files into the database.
 It's set up to run automatically when the application starts up.
+
+By default it reconciles: it compares each JSON file with the database and applies only
+the differences (new and changed items) in bulk. It also remembers the hash of each file
+it applied, so if none of the files changed, a startup costs a single query.
+
+Items that are in the database but not in the file are kept: they may have been added
+by an admin, with the file they were synced to since lost (a redeploy brings back the
+files from git). Set SEED_MODE=reconcile-delete to remove them too, when the files are
+known to be the whole catalog. Set SEED_MODE=empty to go back to the old behaviour of
+only loading into empty tables.
 """
 
+import hashlib
 import json
+import os
+from datetime import datetime
 from pathlib import Path
+from sqlalchemy import delete, insert, update
 from sqlmodel import Session, select
-from .db.models import Temple, Weapon, Fossil
+from .db.models import Temple, Weapon, Fossil, SeedState
 from .core.database import initialize_engine
+from .core.catalog_cache import bump_catalog_version
+from .core.chronology import chronology_columns
+from .db.crud import backfill_chronology_columns, backfill_visit_rollups
 
 # We'll get the engine from our main application file (main.py), where it's initialized.
 def get_engine():
@@ -15,70 +32,177 @@ def get_engine():
 
 DATA_PATH = Path(__file__).parent / "data"
 
+SEED_MODE = os.getenv("SEED_MODE", "reconcile")
+
+# Only this mode removes items that aren't in the JSON files.
+SEED_MODE_RECONCILE_DELETE = "reconcile-delete"
+
+# Each collection, the table it goes into, and the file it comes from.
+SEED_FILES = {
+    "temples": (Temple, "temples.json"),
+    "weapons": (Weapon, "weapons.json"),
+    "fossils": (Fossil, "fossils.json"),
+}
+
+# Columns the JSON files don't manage, so reconciling leaves them alone.
+UNMANAGED_COLUMNS = {"id", "created_at", "updated_by"}
+
 def load_initial_data():
     """
-    This function loads the initial data from our JSON files into the database,
-    but only if the tables are currently empty.
+    This function loads the initial data from our JSON files into the database.
+    Depending on SEED_MODE, it either reconciles every table with its file,
+    or only fills tables that are currently empty.
     """
     
     try:
         engine = get_engine()
         with Session(engine) as session:
-            # Let's start with the temples.
-            temples_file = DATA_PATH / "temples.json"
-            if temples_file.exists():
-                # First, we check if there are any temples already in the database.
-                existing_temples = session.exec(select(Temple)).first()
-                if not existing_temples:
-                    print("→ Loading temples data...")
-                    with open(temples_file, 'r', encoding='utf-8') as f:
-                        temples_data = json.load(f)
-                    
-                    for temple_data in temples_data:
-                        temple = Temple(**temple_data)
-                        session.add(temple)
-                    session.commit()
-                    print(f"  ✓ Loaded {len(temples_data)} temples")
-                else:
-                    print("  ✓ Temples data already exists (skipped)")
-            
-            # Now for the weapons.
-            weapons_file = DATA_PATH / "weapons.json"
-            if weapons_file.exists():
-                existing_weapons = session.exec(select(Weapon)).first()
-                if not existing_weapons:
-                    print("→ Loading weapons data...")
-                    with open(weapons_file, 'r', encoding='utf-8') as f:
-                        weapons_data = json.load(f)
-                    
-                    for weapon_data in weapons_data:
-                        weapon = Weapon(**weapon_data)
-                        session.add(weapon)
-                    session.commit()
-                    print(f"  ✓ Loaded {len(weapons_data)} weapons")
-                else:
-                    print("  ✓ Weapons data already exists (skipped)")
-            
-            # And now, the fossils (replacing animals).
-            fossils_file = DATA_PATH / "fossils.json"
-            if fossils_file.exists():
-                existing_fossils = session.exec(select(Fossil)).first()
-                if not existing_fossils:
-                    print("→ Loading fossils data...")
-                    with open(fossils_file, 'r', encoding='utf-8') as f:
-                        fossils_data = json.load(f)
-                    
-                    for fossil_data in fossils_data:
-                        fossil = Fossil(**fossil_data)
-                        session.add(fossil)
-                    session.commit()
-                    print(f"  ✓ Loaded {len(fossils_data)} fossils")
-                else:
-                    print("  ✓ Fossils data already exists (skipped)")
-            
+            if SEED_MODE == "empty":
+                load_into_empty_tables(session)
+            else:
+                reconcile_with_json(session)
             print("\n✅ Data loading complete!")
     
     except Exception as e:
         print(f"\n❌ ERROR: Failed to load initial data: {e}")
         print("The application will continue, but some data might be missing.")
         # We don't want to crash the app, so we'll just log the error.
+
+def load_into_empty_tables(session: Session):
+    """Loads each JSON file, but only into a table that has no rows yet."""
+    for collection, (model, filename) in SEED_FILES.items():
+        json_file = DATA_PATH / filename
+        if not json_file.exists():
+            continue
+        # First, we check if there's anything in the table already.
+        if session.exec(select(model)).first():
+            print(f"  ✓ {collection.capitalize()} data already exists (skipped)")
+            continue
+        print(f"→ Loading {collection} data...")
+        with open(json_file, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        records = [{**record, **chronology_columns(collection, record)} for record in records]
+        session.execute(insert(model), records)
+        session.commit()
+        print(f"  ✓ Loaded {len(records)} {collection}")
+
+# ===============================================
+# Reconciling
+# ===============================================
+
+def _seed_columns(model) -> list:
+    return [name for name in model.__table__.columns.keys() if name not in UNMANAGED_COLUMNS]
+
+def _record_hash(values: dict) -> str:
+    """A hash of one item's seed columns, so we can tell whether it changed."""
+    canonical = json.dumps(values, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def _reconcile_table(session: Session, model, records: list, delete_missing: bool = False) -> tuple:
+    """
+    Brings one table in line with the records from its JSON file, matching items by id.
+    Records without an id get their position in the file (1, 2, 3...), which is the id
+    they'd have been given on a fresh load. Items that aren't in the file are only
+    removed if `delete_missing` is set.
+    Returns how many items were (inserted, updated, deleted, kept although missing from the file).
+    """
+    columns = _seed_columns(model)
+    wanted = {}
+    for position, record in enumerate(records, start=1):
+        item_id = record.get("id", position)
+        values = {name: record.get(name) for name in columns}
+        # The years are worked out from the dates, rather than read from the file.
+        values.update(chronology_columns(model.__tablename__, values))
+        wanted[item_id] = values
+    
+    existing = {
+        row[0]: dict(zip(columns, row[1:]))
+        for row in session.exec(select(model.id, *[getattr(model, name) for name in columns])).all()
+    }
+    
+    inserts = [{"id": item_id, **values} for item_id, values in wanted.items() if item_id not in existing]
+    updates = [
+        {"id": item_id, **values} for item_id, values in wanted.items()
+        if item_id in existing and _record_hash(values) != _record_hash(existing[item_id])
+    ]
+    missing = [item_id for item_id in existing if item_id not in wanted]
+    deletes = missing if delete_missing else []
+    
+    if inserts:
+        session.execute(insert(model), inserts)
+    if updates:
+        session.execute(update(model), updates)
+    if deletes:
+        session.execute(delete(model).where(model.id.in_(deletes)))
+    return len(inserts), len(updates), len(deletes), len(missing) - len(deletes)
+
+def reconcile_with_json(session: Session):
+    """
+    Applies changes from the JSON files to the database, skipping any file whose
+    hash matches the one we applied last time.
+    """
+    # This is the one query we need when nothing has changed.
+    applied = {state.collection: state for state in session.exec(select(SeedState)).all()}
+    
+    for collection, (model, filename) in SEED_FILES.items():
+        json_file = DATA_PATH / filename
+        if not json_file.exists():
+            continue
+        
+        raw = json_file.read_bytes()
+        file_hash = hashlib.sha256(raw).hexdigest()
+        state = applied.get(collection)
+        if state and state.file_hash == file_hash:
+            print(f"  ✓ {collection.capitalize()} are up to date (skipped)")
+            continue
+        
+        if state is None and session.exec(select(model.id).limit(1)).first() is not None:
+            # This database was filled before we started tracking seed files. Admins may have
+            # edited it since, so we treat what's there as correct and only track future changes.
+            print(f"  ✓ {collection.capitalize()} already loaded; tracking {filename} from now on")
+            inserted = updated = deleted = 0
+        else:
+            print(f"→ Reconciling {collection} with {filename}...")
+            inserted, updated, deleted, kept = _reconcile_table(
+                session, model, json.loads(raw), delete_missing=SEED_MODE == SEED_MODE_RECONCILE_DELETE
+            )
+            print(f"  ✓ {inserted} added, {updated} updated, {deleted} removed")
+            if kept:
+                print(f"  ⚠️  Kept {kept} {collection} that aren't in {filename} (SEED_MODE={SEED_MODE_RECONCILE_DELETE} removes them)")
+        
+        if state is None:
+            state = SeedState(collection=collection, file_hash=file_hash)
+        state.file_hash = file_hash
+        state.applied_at = datetime.utcnow()
+        session.add(state)
+        session.commit()
+        
+        if inserted or updated or deleted:
+            bump_catalog_version(collection)
+
+def backfill_visit_statistics():
+    """
+    Visit statistics are read from daily counters and the visitors table. If this database
+    already had visits before those were added, we count them up once here.
+    """
+    try:
+        with Session(get_engine()) as session:
+            if backfill_visit_rollups(session):
+                print("  ✓ Built visit counters and visitors from existing visits")
+    except Exception as e:
+        print(f"\n❌ ERROR: Failed to build visit counters: {e}")
+        print("Visit statistics may be incomplete until this is fixed.")
+
+def backfill_chronology():
+    """
+    The catalog's start and end years are worked out when items are saved. When the
+    schema changes, items saved before the current rules get theirs worked out again here.
+    """
+    try:
+        with Session(get_engine()) as session:
+            updated = backfill_chronology_columns(session)
+            if updated:
+                print(f"  ✓ Worked out the years of {updated} catalog items")
+    except Exception as e:
+        print(f"\n❌ ERROR: Failed to work out catalog years: {e}")
+        print("The timeline may be missing some items until this is fixed.")
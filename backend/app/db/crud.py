@@ -1,9 +1,22 @@
-from sqlmodel import Session, select
-from typing import List, Optional
-from ..db.models import User, Temple, Weapon, Fossil, Visit, HighScore, Feedback
-from ..core.security import hash_password, verify_password
+from sqlmodel import Session, select, or_, and_
+from sqlalchemy import DateTime, insert, update, func, type_coerce
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence, Tuple, Type
+from ..db.models import User, Temple, Weapon, Fossil, Visit, VisitDailyCount, VisitHourlyCount, Visitor, HighScore, Feedback
+from ..core.security import verify_password
+from ..core.catalog_cache import bump_catalog_version, catalog_item_changed
+from ..core.chronology import chronology_columns
+from ..core.media_index import plain_name
+from ..core.leaderboard import leaderboard
+from ..core.snapshot_writer import snapshot_writer
+import hashlib
 import json
 import os
+import tempfile
+import threading
 from pathlib import Path
 
 # ===============================================
@@ -14,6 +27,35 @@ def get_data_dir():
     """Get the path to the data directory."""
     return Path(__file__).parent.parent / "data"
 
+# Held while a JSON file is written, so two writers in this process don't interleave.
+_snapshot_lock = threading.Lock()
+
+def _write_json_atomically(json_path: Path, data: list) -> bool:
+    """
+    Writes the JSON file through a temporary file and a rename, so readers never see
+    a half-written file. Returns False (and writes nothing) if the file on disk already
+    holds this content. We compare with the file itself rather than remembering what we
+    wrote, because other workers (or people) may have rewritten it since.
+    """
+    content = json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+    digest = hashlib.sha256(content).hexdigest()
+    
+    with _snapshot_lock:
+        if json_path.exists() and hashlib.sha256(json_path.read_bytes()).hexdigest() == digest:
+            return False
+        
+        fd, tmp_path = tempfile.mkstemp(dir=json_path.parent, prefix=f".{json_path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, json_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return True
+
 def sync_temples_to_json(session: Session):
     """Sync all temples from database to temples.json file."""
     try:
@@ -36,12 +78,11 @@ def sync_temples_to_json(session: Session):
                 "audio_story_url": temple.audio_story_url
             })
         
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(temples_data, f, indent=2, ensure_ascii=False)
-        
-        print(f"✅ Synced {len(temples_data)} temples to JSON")
+        if _write_json_atomically(json_path, temples_data):
+            print(f"✅ Synced {len(temples_data)} temples to JSON")
     except Exception as e:
         print(f"❌ Failed to sync temples to JSON: {e}")
+        raise
 
 def sync_weapons_to_json(session: Session):
     """Sync all weapons from database to weapons.json file."""
@@ -63,19 +104,18 @@ def sync_weapons_to_json(session: Session):
                 "audio_story_url": weapon.audio_story_url
             })
         
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(weapons_data, f, indent=2, ensure_ascii=False)
-        
-        print(f"✅ Synced {len(weapons_data)} weapons to JSON")
+        if _write_json_atomically(json_path, weapons_data):
+            print(f"✅ Synced {len(weapons_data)} weapons to JSON")
     except Exception as e:
         print(f"❌ Failed to sync weapons to JSON: {e}")
+        raise
 
 def sync_fossils_to_json(session: Session):
-    """Sync all fossils from database to animals.json file."""
+    """Sync all fossils from database to fossils.json file."""
     try:
         fossils = get_all_fossils(session)
         data_dir = get_data_dir()
-        json_path = data_dir / "animals.json"
+        json_path = data_dir / "fossils.json"
         
         fossils_data = []
         for fossil in fossils:
@@ -92,12 +132,26 @@ def sync_fossils_to_json(session: Session):
                 "audio_story_url": fossil.audio_story_url
             })
         
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(fossils_data, f, indent=2, ensure_ascii=False)
-        
-        print(f"✅ Synced {len(fossils_data)} fossils to JSON")
+        if _write_json_atomically(json_path, fossils_data):
+            print(f"✅ Synced {len(fossils_data)} fossils to JSON")
     except Exception as e:
         print(f"❌ Failed to sync fossils to JSON: {e}")
+        raise
+
+def sync_collection_to_json(collection: str):
+    """
+    Writes one collection's JSON file, using a session of its own. The snapshot writer
+    calls this. It raises if the file couldn't be written, so the writer can try again.
+    """
+    from ..core.database import initialize_engine
+    
+    syncers = {
+        "temples": sync_temples_to_json,
+        "weapons": sync_weapons_to_json,
+        "fossils": sync_fossils_to_json,
+    }
+    with Session(initialize_engine()) as session:
+        syncers[collection](session)
 
 # ===============================================
 # User CRUD Operations
@@ -115,16 +169,16 @@ def get_user_by_email(session: Session, email: str) -> Optional[User]:
     statement = select(User).where(User.email == normalized_email)
     return session.exec(statement).first()
 
-def create_user(session: Session, email: str, password: str) -> User:
+def create_user(session: Session, email: str, hashed_password: str, is_admin: bool = False) -> User:
     """
     Creates a new user with a normalized email address.
     We store all emails in lowercase to keep things tidy.
+    The password must already be hashed (in the password pool, or with `hash_password`).
     """
     # Let's normalize the email before we save it.
     normalized_email = email.lower().strip()
     
-    hashed = hash_password(password)
-    user = User(email=normalized_email, hashed_password=hashed)
+    user = User(email=normalized_email, hashed_password=hashed_password, is_admin=is_admin)
     session.add(user)
     session.commit()
     session.refresh(user)
@@ -143,9 +197,20 @@ def authenticate_user(session: Session, email: str, password: str) -> Optional[U
 # Temple CRUD Operations
 # ===============================================
 
+# The columns that hold media filenames.
+MEDIA_COLUMNS = ("static_image_url", "image_url", "audio_story_url")
+
+def _plain_media_names(data: dict) -> dict:
+    """
+    Media URLs in the catalog carry a content fingerprint, and the admin form can send
+    them back as they are. We store the plain filename, so the fingerprint always
+    follows the file instead of being frozen at the time of the edit.
+    """
+    return {key: plain_name(value) if key in MEDIA_COLUMNS and isinstance(value, str) else value for key, value in data.items()}
+
 def get_all_temples(session: Session) -> List[Temple]:
     """Retrieves all temples, sorted by dynasty."""
-    statement = select(Temple).order_by(Temple.dynasty)
+    statement = select(Temple).order_by(Temple.dynasty, Temple.id)
     return list(session.exec(statement).all())
 
 def get_temple_by_id(session: Session, temple_id: int) -> Optional[Temple]:
@@ -154,11 +219,13 @@ def get_temple_by_id(session: Session, temple_id: int) -> Optional[Temple]:
 
 def create_temple(session: Session, temple_data: dict) -> Temple:
     """Adds a new temple to the database."""
-    temple = Temple(**temple_data)
+    temple_data = _plain_media_names(temple_data)
+    temple = Temple(**temple_data, **chronology_columns("temples", temple_data))
     session.add(temple)
     session.commit()
     session.refresh(temple)
-    sync_temples_to_json(session)
+    catalog_item_changed("temples", temple.id, temple.model_dump())
+    snapshot_writer.schedule("temples")
     return temple
 
 def update_temple(session: Session, temple_id: int, temple_data: dict) -> Optional[Temple]:
@@ -166,12 +233,14 @@ def update_temple(session: Session, temple_id: int, temple_data: dict) -> Option
     temple = session.get(Temple, temple_id)
     if not temple:
         return None
-    for key, value in temple_data.items():
+    temple_data = _plain_media_names(temple_data)
+    for key, value in {**temple_data, **chronology_columns("temples", {**temple.model_dump(), **temple_data})}.items():
         setattr(temple, key, value)
     session.add(temple)
     session.commit()
     session.refresh(temple)
-    sync_temples_to_json(session)
+    catalog_item_changed("temples", temple.id, temple.model_dump())
+    snapshot_writer.schedule("temples")
     return temple
 
 def delete_temple(session: Session, temple_id: int) -> bool:
@@ -181,7 +250,8 @@ def delete_temple(session: Session, temple_id: int) -> bool:
         return False
     session.delete(temple)
     session.commit()
-    sync_temples_to_json(session)
+    catalog_item_changed("temples", temple_id, None)
+    snapshot_writer.schedule("temples")
     return True
 
 # ===============================================
@@ -190,7 +260,7 @@ def delete_temple(session: Session, temple_id: int) -> bool:
 
 def get_all_weapons(session: Session) -> List[Weapon]:
     """Gets all weapons, sorted by name."""
-    statement = select(Weapon).order_by(Weapon.name)
+    statement = select(Weapon).order_by(Weapon.name, Weapon.id)
     return list(session.exec(statement).all())
 
 def get_weapon_by_id(session: Session, weapon_id: int) -> Optional[Weapon]:
@@ -199,11 +269,12 @@ def get_weapon_by_id(session: Session, weapon_id: int) -> Optional[Weapon]:
 
 def create_weapon(session: Session, weapon_data: dict) -> Weapon:
     """Adds a new weapon to the database."""
-    weapon = Weapon(**weapon_data)
+    weapon = Weapon(**_plain_media_names(weapon_data))
     session.add(weapon)
     session.commit()
     session.refresh(weapon)
-    sync_weapons_to_json(session)
+    catalog_item_changed("weapons", weapon.id, weapon.model_dump())
+    snapshot_writer.schedule("weapons")
     return weapon
 
 def update_weapon(session: Session, weapon_id: int, weapon_data: dict) -> Optional[Weapon]:
@@ -211,12 +282,13 @@ def update_weapon(session: Session, weapon_id: int, weapon_data: dict) -> Option
     weapon = session.get(Weapon, weapon_id)
     if not weapon:
         return None
-    for key, value in weapon_data.items():
+    for key, value in _plain_media_names(weapon_data).items():
         setattr(weapon, key, value)
     session.add(weapon)
     session.commit()
     session.refresh(weapon)
-    sync_weapons_to_json(session)
+    catalog_item_changed("weapons", weapon.id, weapon.model_dump())
+    snapshot_writer.schedule("weapons")
     return weapon
 
 def delete_weapon(session: Session, weapon_id: int) -> bool:
@@ -226,7 +298,8 @@ def delete_weapon(session: Session, weapon_id: int) -> bool:
         return False
     session.delete(weapon)
     session.commit()
-    sync_weapons_to_json(session)
+    catalog_item_changed("weapons", weapon_id, None)
+    snapshot_writer.schedule("weapons")
     return True
 
 # ===============================================
@@ -235,7 +308,7 @@ def delete_weapon(session: Session, weapon_id: int) -> bool:
 
 def get_all_fossils(session: Session) -> List[Fossil]:
     """Retrieves all fossils, sorted by era."""
-    statement = select(Fossil).order_by(Fossil.era)
+    statement = select(Fossil).order_by(Fossil.era, Fossil.id)
     return list(session.exec(statement).all())
 
 def get_fossil_by_id(session: Session, fossil_id: int) -> Optional[Fossil]:
@@ -244,11 +317,13 @@ def get_fossil_by_id(session: Session, fossil_id: int) -> Optional[Fossil]:
 
 def create_fossil(session: Session, fossil_data: dict, user_id: int) -> Fossil:
     """Adds a new fossil to the database."""
-    fossil = Fossil(**fossil_data, updated_by=user_id)
+    fossil_data = _plain_media_names(fossil_data)
+    fossil = Fossil(**fossil_data, **chronology_columns("fossils", fossil_data), updated_by=user_id)
     session.add(fossil)
     session.commit()
     session.refresh(fossil)
-    sync_fossils_to_json(session)
+    catalog_item_changed("fossils", fossil.id, fossil.model_dump())
+    snapshot_writer.schedule("fossils")
     return fossil
 
 def update_fossil(session: Session, fossil_id: int, fossil_data: dict, user_id: int) -> Optional[Fossil]:
@@ -256,13 +331,15 @@ def update_fossil(session: Session, fossil_id: int, fossil_data: dict, user_id:
     fossil = session.get(Fossil, fossil_id)
     if not fossil:
         return None
-    for key, value in fossil_data.items():
+    fossil_data = _plain_media_names(fossil_data)
+    for key, value in {**fossil_data, **chronology_columns("fossils", {**fossil.model_dump(), **fossil_data})}.items():
         setattr(fossil, key, value)
     setattr(fossil, "updated_by", user_id)
     session.add(fossil)
     session.commit()
     session.refresh(fossil)
-    sync_fossils_to_json(session)
+    catalog_item_changed("fossils", fossil.id, fossil.model_dump())
+    snapshot_writer.schedule("fossils")
     return fossil
 
 def delete_fossil(session: Session, fossil_id: int) -> bool:
@@ -272,42 +349,304 @@ def delete_fossil(session: Session, fossil_id: int) -> bool:
         return False
     session.delete(fossil)
     session.commit()
-    sync_fossils_to_json(session)
+    catalog_item_changed("fossils", fossil_id, None)
+    snapshot_writer.schedule("fossils")
     return True
 
+# ===============================================
+# Bulk Catalog Import/Export
+# ===============================================
+
+# The table behind each catalog collection.
+CATALOG_MODELS = {
+    "temples": Temple,
+    "weapons": Weapon,
+    "fossils": Fossil,
+}
+
+def bulk_create_catalog_items(session: Session, collection: str, items: List[dict], user_id: Optional[int] = None) -> int:
+    """
+    Saves a batch of already-validated items in one transaction. Items with an `id`
+    replace the item with that id (or are created with it); the rest are inserted.
+    This deliberately skips the catalog cache and JSON sync. Call `finish_catalog_import`
+    once the whole import is done.
+    """
+    if not items:
+        return 0
+    items = [_plain_media_names(item) for item in items]
+    items = [{**item, **chronology_columns(collection, item)} for item in items]
+    if collection == "fossils":
+        items = [{**item, "updated_by": user_id} for item in items]
+    model = CATALOG_MODELS[collection]
+    new_items = [item for item in items if item.get("id") is None]
+    if new_items:
+        session.execute(insert(model), [{key: value for key, value in item.items() if key != "id"} for item in new_items])
+    _upsert_by_id(session, model, [item for item in items if item.get("id") is not None])
+    session.commit()
+    return len(items)
+
+def _upsert_by_id(session: Session, model: Type, rows: List[dict]):
+    """Inserts each row with its id, or overwrites the row that already has that id (not committed here)."""
+    if not rows:
+        return
+    table = model.__table__
+    columns = [name for name in rows[0] if name != "id"]
+    if session.get_bind().dialect.name == "sqlite":
+        statement = sqlite_insert(table).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=["id"],
+            set_={name: statement.excluded[name] for name in columns},
+        )
+    else:
+        statement = mysql_insert(table).values(rows)
+        statement = statement.on_duplicate_key_update({name: statement.inserted[name] for name in columns})
+    session.execute(statement)
+
+def finish_catalog_import(collection: str):
+    """Refreshes the catalog cache and schedules one JSON sync after a bulk import."""
+    bump_catalog_version(collection)
+    snapshot_writer.schedule(collection)
+
+def stream_catalog_items(collection: str, fields: Sequence[str], batch_size: int = 500):
+    """
+    Yields every item in a collection as a dict, in id order.
+    It uses a server-side cursor, so rows come from MySQL in batches instead of all at once.
+    It opens its own session, because a streaming response outlives the request's session.
+    """
+    from ..core.database import initialize_engine
+    
+    model = CATALOG_MODELS[collection]
+    columns = [getattr(model, name) for name in fields]
+    with Session(initialize_engine()) as session:
+        statement = select(*columns).order_by(model.id).execution_options(yield_per=batch_size)
+        for row in session.exec(statement):
+            yield dict(zip(fields, row))
+
+# ===============================================
+# Catalog Pagination
+# ===============================================
+
+# The column each collection is listed by. The id breaks ties, so pages never skip or repeat rows.
+CATALOG_SORT_COLUMNS = {
+    Temple: "dynasty",
+    Weapon: "name",
+    Fossil: "era",
+}
+
+def _after_cursor(model: Type, after: Tuple):
+    """The rows that come after (sort value, id) in catalog order."""
+    sort_column = getattr(model, CATALOG_SORT_COLUMNS[model])
+    sort_value, last_id = after
+    return or_(
+        sort_column > sort_value,
+        and_(sort_column == sort_value, model.id > last_id),
+    )
+
+def get_catalog_page(
+    session: Session,
+    model: Type,
+    fields: Sequence[str],
+    after: Optional[Tuple] = None,
+    limit: int = 50,
+) -> List[dict]:
+    """
+    Fetches one page of temples, weapons or fossils, selecting only the requested columns.
+    We use keyset pagination: `after` is the (sort value, id) of the last row on the previous
+    page, so the database can seek straight to the next row instead of skipping an OFFSET.
+    The id and sort columns are always included, since the caller needs them for the next cursor.
+    """
+    sort_name = CATALOG_SORT_COLUMNS[model]
+    sort_column = getattr(model, sort_name)
+    names = list(dict.fromkeys(["id", sort_name, *fields]))
+    
+    statement = select(*[getattr(model, name) for name in names])
+    if after is not None:
+        statement = statement.where(_after_cursor(model, after))
+    statement = statement.order_by(sort_column, model.id).limit(limit)
+    return [dict(zip(names, row)) for row in session.exec(statement).all()]
+
+def count_catalog_rows_before(session: Session, model: Type, after: Tuple) -> int:
+    """How many rows come up to and including (sort value, id) in catalog order, whether or not that row still exists."""
+    return session.exec(select(func.count()).select_from(model).where(~_after_cursor(model, after))).one()
+
 # ===============================================
 # Visit CRUD Operations
 # ===============================================
 
+def _add_to_counters(session: Session, model: Type, key_columns: Sequence[str], rows: List[dict]):
+    """
+    Adds each row's `visit_count` to the matching counter row, creating it if needed.
+    This is an upsert, so concurrent workers can bump the same counter safely.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    if session.get_bind().dialect.name == "sqlite":
+        statement = sqlite_insert(table).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={"visit_count": table.c.visit_count + statement.excluded.visit_count},
+        )
+    else:
+        statement = mysql_insert(table).values(rows)
+        statement = statement.on_duplicate_key_update(
+            visit_count=table.c.visit_count + statement.inserted.visit_count
+        )
+    session.execute(statement)
+
+def _add_visitors(session: Session, rows: List[dict]):
+    """Adds a `visitors` row for each user who doesn't have one yet; users we already have are left alone."""
+    if not rows:
+        return
+    table = Visitor.__table__
+    if session.get_bind().dialect.name == "sqlite":
+        statement = sqlite_insert(table).values(rows).on_conflict_do_nothing(index_elements=["user_id"])
+    else:
+        statement = mysql_insert(table).values(rows)
+        # A no-op update, rather than INSERT IGNORE, so only duplicates are skipped.
+        statement = statement.on_duplicate_key_update(user_id=table.c.user_id)
+    session.execute(statement)
+
+def _start_of_hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+def _update_visit_rollups(session: Session, visits: List[dict]):
+    """Bumps the per-room daily and hourly counters, and notes any new visitors, for a batch of visits (not committed here)."""
+    daily = Counter((visit["visited_at"].date(), visit["room_visited"]) for visit in visits)
+    _add_to_counters(session, VisitDailyCount, ("day", "room_visited"), [
+        {"day": day, "room_visited": room, "visit_count": count}
+        for (day, room), count in daily.items()
+    ])
+    hourly = Counter((_start_of_hour(visit["visited_at"]), visit["room_visited"]) for visit in visits)
+    _add_to_counters(session, VisitHourlyCount, ("hour", "room_visited"), [
+        {"hour": hour, "room_visited": room, "visit_count": count}
+        for (hour, room), count in hourly.items()
+    ])
+    first_visits = {}
+    for visit in visits:
+        first_visits[visit["user_id"]] = min(visit["visited_at"], first_visits.get(visit["user_id"], visit["visited_at"]))
+    _add_visitors(session, [
+        {"user_id": user_id, "first_visited_at": visited_at}
+        for user_id, visited_at in first_visits.items()
+    ])
+
 def create_visit(session: Session, user_id: int, room_visited: str) -> Visit:
     """Records a visit to a specific room."""
     visit = Visit(user_id=user_id, room_visited=room_visited)
     session.add(visit)
+    _update_visit_rollups(session, [visit.model_dump()])
     session.commit()
     session.refresh(visit)
     return visit
 
+def create_visits_bulk(session: Session, visits: List[dict]) -> int:
+    """
+    Saves a batch of visits with a single multi-row INSERT and one commit.
+    Each visit is a dict with `user_id`, `room_visited` and `visited_at`.
+    The daily counters are updated in the same transaction, so they always agree with the visits.
+    """
+    if not visits:
+        return 0
+    session.execute(insert(Visit), visits)
+    _update_visit_rollups(session, visits)
+    session.commit()
+    return len(visits)
+
+def _hour_of(session: Session, column):
+    """
+    SQL that truncates a datetime column to the start of its hour, as a datetime that's
+    equal to the `hour` keys the counters are written with.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        # SQLite keeps datetimes as text, in the format SQLAlchemy writes (with microseconds).
+        return type_coerce(func.strftime("%Y-%m-%d %H:00:00.000000", column), DateTime)
+    return func.timestamp(func.date_format(column, "%Y-%m-%d %H:00:00"))
+
+def backfill_chronology_columns(session: Session) -> int:
+    """
+    Works out `start_year` and `end_year` again for every dated item, and saves the ones
+    that changed: items saved before those columns existed, or before we stored open
+    ranges ("... - Present") without an end year. It reads the whole catalog, so it's
+    only run when the schema changes. Returns how many items were updated.
+    """
+    updated = 0
+    for collection in ("temples", "fossils"):
+        model = CATALOG_MODELS[collection]
+        updates = []
+        for item in session.exec(select(model)).all():
+            columns = chronology_columns(collection, item.model_dump())
+            if (columns["start_year"], columns["end_year"]) != (item.start_year, item.end_year):
+                updates.append({"id": item.id, **columns})
+        if updates:
+            session.execute(update(model), updates)
+            session.commit()
+            bump_catalog_version(collection)
+            updated += len(updates)
+    return updated
+
+def backfill_visit_rollups(session: Session) -> bool:
+    """
+    Fills the daily and hourly counters and the visitors table from the visits table,
+    for databases that had visits before those existed. Each table is only filled while
+    it's still empty.
+    """
+    if session.exec(select(Visit.id).limit(1)).first() is None:
+        return False
+    
+    filled = False
+    for model, bucket, key in (
+        (VisitDailyCount, func.date(Visit.visited_at), "day"),
+        (VisitHourlyCount, _hour_of(session, Visit.visited_at), "hour"),
+    ):
+        if session.exec(select(model).limit(1)).first() is not None:
+            continue
+        session.execute(
+            insert(model).from_select(
+                [key, "room_visited", "visit_count"],
+                select(bucket, Visit.room_visited, func.count()).group_by(bucket, Visit.room_visited),
+            )
+        )
+        filled = True
+    if session.exec(select(Visitor).limit(1)).first() is None:
+        session.execute(
+            insert(Visitor).from_select(
+                ["user_id", "first_visited_at"],
+                select(Visit.user_id, func.min(Visit.visited_at)).group_by(Visit.user_id),
+            )
+        )
+        filled = True
+    session.commit()
+    return filled
+
 def get_visit_stats(session: Session, user_id: Optional[int] = None) -> dict:
-    """Gets visit statistics for a user or all users."""
+    """
+    Gets visit statistics for a user or all users.
+    Museum-wide numbers come from the daily counters and the visitors table, so they cost
+    the same however many visits we've stored. A single user's numbers are grouped in SQL
+    using their own index.
+    """
     if user_id:
-        statement = select(Visit).where(Visit.user_id == user_id)
-        visits = list(session.exec(statement).all())
+        statement = (
+            select(Visit.room_visited, func.count())
+            .where(Visit.user_id == user_id)
+            .group_by(Visit.room_visited)
+        )
+        room_counts = dict(session.exec(statement).all())
+        unique_users = 1 if room_counts else 0
     else:
-        statement = select(Visit)
-        visits = list(session.exec(statement).all())
-    
-    # Calculate room counts
-    room_counts = {}
-    for visit in visits:
-        room_counts[visit.room_visited] = room_counts.get(visit.room_visited, 0) + 1
+        statement = (
+            select(VisitDailyCount.room_visited, func.sum(VisitDailyCount.visit_count))
+            .group_by(VisitDailyCount.room_visited)
+        )
+        room_counts = {room: int(count) for room, count in session.exec(statement).all()}
+        unique_users = session.exec(select(func.count()).select_from(Visitor)).one()
     
     # Calculate comprehensive statistics
-    total_visits = len(visits)
-    unique_users = len(set(visit.user_id for visit in visits)) if visits else 0
+    total_visits = sum(room_counts.values())
     
     # Calculate average duration (mock for now - would need start/end timestamps in real impl)
     average_visit_duration = 0
-    if visits:
+    if total_visits:
         # Mock calculation: assume 5 minutes per visit on average
         average_visit_duration = 5
     
@@ -318,6 +657,59 @@ def get_visit_stats(session: Session, user_id: Optional[int] = None) -> dict:
         "average_visit_duration": average_visit_duration
     }
 
+# The longest series we'll return in one go, so nobody asks for ten years by the hour.
+MAX_TIMESERIES_BUCKETS = 5000
+
+def get_visit_timeseries(
+    session: Session,
+    start: datetime,
+    end: datetime,
+    bucket: str = "day",
+    room: Optional[str] = None,
+) -> dict:
+    """
+    Gets visit counts per room for each hour or day between `start` and `end` (UTC).
+    It reads the pre-aggregated counters, so the cost depends on the length of the range,
+    not on how many visits there were. Buckets with no visits are filled in with 0.
+    """
+    if bucket == "hour":
+        model, column, step = VisitHourlyCount, VisitHourlyCount.hour, timedelta(hours=1)
+        first, last = _start_of_hour(start), end
+    else:
+        model, column, step = VisitDailyCount, VisitDailyCount.day, timedelta(days=1)
+        first, last = start.date(), end.date()
+    
+    buckets = []
+    current = first
+    while current <= last:
+        buckets.append(current)
+        current += step
+        if len(buckets) > MAX_TIMESERIES_BUCKETS:
+            raise ValueError(f"That range has more than {MAX_TIMESERIES_BUCKETS} {bucket}s. Try a shorter range or daily buckets.")
+    
+    statement = select(column, model.room_visited, model.visit_count).where(column >= first, column <= last)
+    if room:
+        statement = statement.where(model.room_visited == room)
+    
+    # Every room gets a series, even one nobody visited in this range.
+    if room:
+        counts = {room: {}}
+    else:
+        counts = {room_name: {} for room_name in session.exec(select(VisitHourlyCount.room_visited).distinct()).all()}
+    for moment, room_name, count in session.exec(statement).all():
+        counts.setdefault(room_name, {})[moment] = count
+    
+    series = {
+        room_name: [{"bucket_start": moment, "count": by_bucket.get(moment, 0)} for moment in buckets]
+        for room_name, by_bucket in sorted(counts.items())
+    }
+    return {
+        "bucket": bucket,
+        "start": first,
+        "end": last,
+        "series": series,
+    }
+
 # ===============================================
 # High Score CRUD Operations
 # ===============================================
@@ -328,15 +720,23 @@ def create_high_score(session: Session, user_id: int, score: int, game_mode: str
     session.add(high_score)
     session.commit()
     session.refresh(high_score)
+    leaderboard.add(high_score)
     return high_score
 
 def get_leaderboard(session: Session, game_mode: Optional[str] = None, limit: int = 10) -> List[HighScore]:
-    """Gets the top scores, optionally filtered by game mode."""
-    if game_mode:
-        statement = select(HighScore).where(HighScore.game_mode == game_mode).order_by(HighScore.score.desc()).limit(limit)
-    else:
-        statement = select(HighScore).order_by(HighScore.score.desc()).limit(limit)
-    return list(session.exec(statement).all())
+    """Gets the top scores, optionally filtered by game mode. Served from the in-memory leaderboard."""
+    leaderboard.refresh(session)
+    return [score for _, score in leaderboard.top(game_mode, limit)]
+
+def get_leaderboard_around(session: Session, game_mode: Optional[str], rank: int, radius: int) -> List[Tuple[int, HighScore]]:
+    """Gets the (rank, score) entries within `radius` places of a rank."""
+    leaderboard.refresh(session)
+    return leaderboard.around_rank(game_mode, rank, radius, radius)
+
+def get_user_rank(session: Session, user_id: int, game_mode: Optional[str] = None) -> Optional[Tuple[int, HighScore, int]]:
+    """Gets a user's best (rank, score) in a game mode, along with the total number of entries."""
+    leaderboard.refresh(session)
+    return leaderboard.user_rank(game_mode, user_id)
 
 def get_user_high_scores(session: Session, user_id: int) -> List[HighScore]:
     """Gets all high scores for a specific user."""
@@ -1,6 +1,7 @@
-from sqlmodel import SQLModel, Field, Column, JSON
+from sqlmodel import SQLModel, Field, Column, JSON, Index
+from sqlalchemy import BigInteger
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 
 class User(SQLModel, table=True):
     """This model represents a user in our system, used for authentication."""
@@ -19,7 +20,7 @@ class Temple(SQLModel, table=True):
     
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(index=True, max_length=255)
-    dynasty: str = Field(max_length=255)
+    dynasty: str = Field(index=True, max_length=255)  # Indexed because the catalog is listed by dynasty
     builder: str = Field(max_length=255)
     time_period: str = Field(max_length=255)
     historical_significance: str = Field(sa_column=Column("historical_significance", JSON))
@@ -27,6 +28,9 @@ class Temple(SQLModel, table=True):
     static_image_url: str = Field(max_length=500)
     model_3d_embed: Optional[str] = Field(default=None, max_length=500)  # This will be the Sketchfab model ID.
     audio_story_url: str = Field(max_length=500)
+    # The years `time_period` covers (BC is negative), worked out whenever it's saved. Indexed for the timeline.
+    start_year: Optional[int] = Field(default=None, index=True)
+    end_year: Optional[int] = Field(default=None, index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class Weapon(SQLModel, table=True):
@@ -50,25 +54,67 @@ class Fossil(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(index=True, max_length=255)  # e.g., Ammonite, Trilobite
     fossil_type: str = Field(max_length=100)  # Category of fossil
-    era: str = Field(max_length=100)  # Geological era (e.g., Jurassic, Cambrian)
+    era: str = Field(index=True, max_length=100)  # Geological era (e.g., Jurassic, Cambrian)
     age_in_years: str = Field(max_length=100)  # Human-readable age (e.g., "200 million years ago")
     description: str = Field(sa_column=Column("description", JSON))  # Detailed paleontological information
     origin_location: str = Field(max_length=255)  # Where the fossil was found
     image_url: str = Field(max_length=500)
     model_3d_embed: Optional[str] = Field(default=None, max_length=500)  # Sketchfab model ID for 3D visualization
     audio_story_url: str = Field(max_length=500)  # Audio narration about the fossil
+    # The years `age_in_years` covers, counted back from year 0. Big integers, as fossils go back billions of years.
+    start_year: Optional[int] = Field(default=None, index=True, sa_type=BigInteger)
+    end_year: Optional[int] = Field(default=None, index=True, sa_type=BigInteger)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_by: Optional[int] = Field(default=None, foreign_key="users.id")  # Admin who last updated
 
 class Visit(SQLModel, table=True):
     """Tracks visits to the museum by users."""
     __tablename__ = "visits"
+    __table_args__ = (
+        # Lets per-user stats group by room without touching other users' visits.
+        Index("ix_visits_user_room", "user_id", "room_visited"),
+        # Lets time-range questions about one room read just that slice of the table.
+        Index("ix_visits_room_time", "room_visited", "visited_at"),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="users.id")
     visited_at: datetime = Field(default_factory=datetime.utcnow)
     room_visited: str = Field(max_length=50)  # temples, weapons, fossils, game
 
+class VisitDailyCount(SQLModel, table=True):
+    """
+    A running count of visits per room per day (UTC).
+    It's updated in the same transaction as the visits themselves, so visit statistics
+    can be read from here instead of counting every row in the visits table.
+    """
+    __tablename__ = "visit_daily_counts"
+    
+    day: date = Field(primary_key=True)
+    room_visited: str = Field(primary_key=True, max_length=50)
+    visit_count: int = Field(default=0)
+
+class VisitHourlyCount(SQLModel, table=True):
+    """The same running count as VisitDailyCount, but per hour (UTC), for the analytics charts."""
+    __tablename__ = "visit_hourly_counts"
+    __table_args__ = (
+        Index("ix_visit_hourly_counts_room_hour", "room_visited", "hour"),
+    )
+    
+    hour: datetime = Field(primary_key=True)  # The start of the hour, e.g. 14:00:00
+    room_visited: str = Field(primary_key=True, max_length=50)
+    visit_count: int = Field(default=0)
+
+class Visitor(SQLModel, table=True):
+    """
+    Everyone who has visited at least one room, one row each. It's filled in with the
+    visits, so the museum-wide visitor count doesn't have to look at every visit.
+    """
+    __tablename__ = "visitors"
+    
+    user_id: int = Field(foreign_key="users.id", primary_key=True)
+    first_visited_at: datetime = Field(default_factory=datetime.utcnow)
+
 class HighScore(SQLModel, table=True):
     """Tracks high scores from the gamification section."""
     __tablename__ = "high_scores"
@@ -76,7 +122,7 @@ class HighScore(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="users.id", index=True)
     score: int = Field(index=True)
-    game_mode: str = Field(max_length=100)  # Type of game/quiz
+    game_mode: str = Field(index=True, max_length=100)  # Type of game/quiz
     achieved_at: datetime = Field(default_factory=datetime.utcnow)
 
 class Feedback(SQLModel, table=True):
@@ -88,3 +134,19 @@ class Feedback(SQLModel, table=True):
     rating: int = Field(ge=1, le=5)  # 1-5 star rating
     message: str = Field(max_length=1000)
     submitted_at: datetime = Field(default_factory=datetime.utcnow)
+
+class SeedState(SQLModel, table=True):
+    """Remembers which version of each JSON seed file was last applied to the database."""
+    __tablename__ = "seed_state"
+    
+    collection: str = Field(primary_key=True, max_length=50)  # temples, weapons, fossils
+    file_hash: str = Field(max_length=64)  # SHA-256 of the JSON file
+    applied_at: datetime = Field(default_factory=datetime.utcnow)
+
+class SchemaVersion(SQLModel, table=True):
+    """Remembers the fingerprint of the table definitions the database was last set up with."""
+    __tablename__ = "schema_version"
+    
+    id: int = Field(default=1, primary_key=True)  # There's only ever one row
+    fingerprint: str = Field(max_length=64)  # SHA-256 of the CREATE TABLE / CREATE INDEX statements
+    applied_at: datetime = Field(default_factory=datetime.utcnow)
@@ -1,6 +1,5 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 import os
 
@@ -14,8 +13,19 @@ from .api.fossils import router as fossils_router
 from .api.admin import router as admin_router
 from .api.feedback import router as feedback_router
 from .api.gamification import router as gamification_router
-from .core.database import create_db_and_tables, initialize_engine
-from .data_loader import load_initial_data
+from .core.database import initialize_engine
+from .core.bootstrap import bootstrap_lock, ensure_schema, print_startup_timings, startup_phase, startup_timings
+from .core.security import shutdown_password_pool
+from .core.leaderboard import load_leaderboard
+from .core.visit_buffer import visit_buffer
+from .core.snapshot_writer import snapshot_writer
+from .core.media_response import RangeStaticFiles
+from .core.media_index import load_media_index, media_index
+from .core.image_variants import image_variants
+from .core.image_placeholders import image_placeholders
+from .core.catalog_index import build_catalog_indexes
+from .core.catalog_related import related_index
+from .data_loader import load_initial_data, backfill_chronology, backfill_visit_statistics
 
 app = FastAPI(
     title="Indian Temple Heritage Museum API",
@@ -31,19 +41,45 @@ def on_startup():
     print("="*80 + "\n")
     
     # First, we'll connect to the database. If the database doesn't exist, it will be created automatically.
-    print("Step 1: Initializing Database Connection")
-    print("-" * 80)
-    initialize_engine()
+    with startup_phase("Step 1: Initializing Database Connection"):
+        engine = initialize_engine()
     
-    # Now, let's create the tables for our users, temples, etc.
-    print("\nStep 2: Creating Database Tables")
-    print("-" * 80)
-    create_db_and_tables()
+    # Only one worker sets up the tables and loads the data; the others wait here and then skip it.
+    with bootstrap_lock(engine):
+        # Now, let's create the tables for our users, temples, etc. (if our models changed since last time).
+        with startup_phase("Step 2: Creating Database Tables"):
+            schema_changed = ensure_schema(engine)
+        
+        # Time to fill our museum! Let's load all the temple, weapon, and fossil data from our JSON files.
+        with startup_phase("Step 3: Loading Initial Data from JSON Files"):
+            load_initial_data()
+            backfill_visit_statistics()
+            # Working out the catalog's years reads every item, so we only do it after a schema change.
+            if schema_changed:
+                backfill_chronology()
     
-    # Time to fill our museum! Let's load all the temple, weapon, and fossil data from our JSON files.
-    print("\nStep 3: Loading Initial Data from JSON Files")
-    print("-" * 80)
-    load_initial_data()
+    # The game leaderboard lives in memory, so we fill it from the high scores table.
+    with startup_phase("Step 4: Loading the Game Leaderboard"):
+        load_leaderboard()
+    
+    # Index the images and audio in app/static, so media requests don't have to touch the disk.
+    # After this, a background thread picks up any files that change.
+    with startup_phase("Step 5: Indexing Media Files"):
+        load_media_index()
+    
+    # Blurred image placeholders for the catalog are made in the background.
+    image_placeholders.start()
+    
+    # Search and the other catalog indexes live in memory, so we build them before the first visitor arrives.
+    with startup_phase("Step 6: Building Catalog Indexes"):
+        build_catalog_indexes()
+    
+    # Related items are worked out in the background, and again after admin edits.
+    related_index.start()
+    
+    # Room visits are saved in batches by a background writer.
+    visit_buffer.start()
+    print_startup_timings()
     
     print("\n" + "="*80)
     print("✅ APPLICATION STARTUP COMPLETE!")
@@ -54,6 +90,19 @@ def on_startup():
     print("   → API Docs: http://localhost:8000/docs")
     print("\n" + "="*80 + "\n")
 
+# And this one runs when the server stops, so we can tidy up after ourselves.
+@app.on_event("shutdown")
+def on_shutdown():
+    # Write out any room visits that are still waiting in memory.
+    visit_buffer.stop()
+    # And save any admin edits that haven't made it into the JSON files yet.
+    snapshot_writer.stop()
+    shutdown_password_pool()
+    image_variants.shutdown()
+    image_placeholders.stop()
+    related_index.stop()
+    media_index.stop()
+
 # CORS configuration - allow frontend to access backend
 frontend_url = os.getenv("FRONTEND_URL", "http://localhost:5173")
 environment = os.getenv("ENVIRONMENT", "development")
@@ -80,9 +129,9 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
-# This makes our images and audio files available to the frontend.
+# This makes our images and audio files available to the frontend (with Range support, for seeking in audio).
 static_dir = os.path.join(os.path.dirname(__file__), "static")
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
+app.mount("/static", RangeStaticFiles(directory=static_dir), name="static")
 
 app.include_router(auth_router)
 app.include_router(user_router)
@@ -107,5 +156,6 @@ def health_check():
     """Health check endpoint for Railway monitoring"""
     return {
         "status": "healthy",
-        "service": "Indian Temple Heritage Museum API"
+        "service": "Indian Temple Heritage Museum API",
+        "startup_seconds": startup_timings
     }
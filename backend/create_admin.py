@@ -8,7 +8,9 @@ Usage: python create_admin.py
 from sqlmodel import Session, select
 from app.db.models import User
 from app.core.security import hash_password
+from app.db.crud import create_user
 from app.core.database import initialize_engine
+from app.core.user_cache import invalidate_user
 
 def create_admin_user():
     """Creates an admin user with predefined credentials."""
@@ -44,6 +46,8 @@ def create_admin_user():
                     existing_admin.is_admin = True
                     session.add(existing_admin)
                     session.commit()
+                    # Running servers may have this user cached without admin rights, so let them know.
+                    invalidate_user(existing_admin.id)
                     print("✅ User updated to admin!")
                 else:
                     print("\n✅ Admin user is already configured correctly.")
@@ -55,17 +59,7 @@ def create_admin_user():
                 # Create new admin user
                 print(f"✨ Creating new admin user...")
                 
-                hashed_password = hash_password(ADMIN_PASSWORD)
-                admin_user = User(
-                    email=ADMIN_EMAIL.lower(),
-                    hashed_password=hashed_password,
-                    is_admin=True,
-                    is_active=True
-                )
-                
-                session.add(admin_user)
-                session.commit()
-                session.refresh(admin_user)
+                create_user(session, ADMIN_EMAIL, hash_password(ADMIN_PASSWORD), is_admin=True)
                 
                 print("\n" + "="*80)
                 print("✅ ADMIN USER CREATED SUCCESSFULLY!")